@@ -1,19 +1,35 @@
 import uvicorn
 import traceback
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends
 from helpers.utils import Utils
 from databases.base import Base
 from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.aws import aws_clients, async_aws_clients
 from bedrock.stream import Streaming
+from bedrock.cancel import cancel_on_disconnect
 import databases.models as db_models
 from contextlib import asynccontextmanager
-from helpers.config import AppConfig, AWSConfig, DatabaseConfig
+from helpers.config import AppConfig, AWSConfig, DatabaseConfig, StreamConfig
 from fastapi.middleware.cors import CORSMiddleware
 from helpers.datamodel import ChatAgentRequest, ChatLLMRequest
+from typing import AsyncIterator, Optional
 from fastapi.responses import StreamingResponse, JSONResponse
-from databases.database import engine, create_database_if_not_exists
+from starlette.background import BackgroundTask
+from databases.database import engine, create_database_if_not_exists, upgrade_schema
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from databases.seeds import seed_initial_data
+from helpers.secret import aws_secret_manager
+from helpers.auth import api_credential_verifier, require_api_credential, CredentialError
+from helpers.admission import admission_controller, AdmissionRejected, AdmissionTicket
+from helpers.attachments import attachment_store, AttachmentTooLarge
+from helpers.images import image_processor
+from tools.registry import tool_registry
+from bedrock.registry import model_registry
+from tools.executor import tool_executor
+from tools.cache import tool_result_cache
+from databases.session_store import conversation_store
+from databases.writer import message_writer
 
 from routers.user import router as user_router
 from routers.message import router as message_router
@@ -24,6 +40,7 @@ from routers.agent import router as agent_router
 app_conf = AppConfig()
 aws_conf = AWSConfig()
 db_conf = DatabaseConfig()
+stream_conf = StreamConfig()
 streaming = Streaming()
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
@@ -31,27 +48,46 @@ SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
+        await aws_secret_manager.start()
+
         if db_conf.db_enable == "enable":
             try:
                 await create_database_if_not_exists()
                 async with engine.begin() as conn:
                     await conn.run_sync(db_models.Base.metadata.create_all)
+                    await upgrade_schema(conn)
                 logger.info("✅ Tables synchronized with models.")
 
                 # --- Seeding initial data ---
                 async with SessionLocal() as session:
                     await seed_initial_data(session)
                 logger.info("🌱 Database seeding completed successfully.")
+
+                await tool_registry.start()
+                await model_registry.start()
+                await message_writer.start()
             except Exception as e:
                 logger.error(f"❌ Database initialization failed: {e}")
         else:
             logger.warning("⚠️ Database initialization skipped.")
 
+        await api_credential_verifier.start()
+
         yield  # <-- always yield, even if startup fails
 
     finally:
+        await api_credential_verifier.stop()
+        await aws_secret_manager.stop()
+        tool_executor.shutdown()
+        await tool_result_cache.close()
+        await async_aws_clients.close()
+        attachment_store.close()
+        image_processor.shutdown()
         try:
             if db_conf.db_enable == "enable":
+                await message_writer.stop()
+                await tool_registry.stop()
+                await model_registry.stop()
                 await engine.dispose()
                 logger.info("🧹 Database connection closed.")
         except Exception as e:
@@ -74,34 +110,63 @@ app.include_router(tool_router)
 app.include_router(llm_router)
 app.include_router(agent_router)
 
+@app.exception_handler(CredentialError)
+async def credential_error_handler(request: Request, exc: CredentialError):
+    return JSONResponse(status_code=exc.status_code, content={"msg": exc.msg})
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(status_code=429, content={"msg": exc.msg}, headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(AttachmentTooLarge)
+async def attachment_too_large_handler(request: Request, exc: AttachmentTooLarge):
+    return JSONResponse(status_code=413, content={"msg": exc.msg})
+
+def resolve_stream_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """Explicit `stream_format` wins; otherwise SSE only when the client asks for it."""
+    if requested:
+        return requested
+    return "sse" if accept and "text/event-stream" in accept else "raw"
+
+def stream_response(body: AsyncIterator[str], stream_format: str, http_req: Request, endpoint: str, ticket: AdmissionTicket) -> StreamingResponse:
+    body = ticket.guard(cancel_on_disconnect(body, http_req.is_disconnected, float(stream_conf.stream_disconnect_poll_interval), endpoint))
+    # The background task covers responses whose body never starts
+    if stream_format == "sse":
+        return StreamingResponse(
+            body,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            background=BackgroundTask(ticket.release),
+        )
+    return StreamingResponse(body, media_type="text/html", background=BackgroundTask(ticket.release))
+
 # ------------------- API Endpoint -------------------
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def get_metrics():
+    aws_clients.publish_metrics()
+    return metrics.snapshot()
+
 @app.post(f"/{app_conf.api_ver_1}/chat/agent/completions")
-async def chat_agent_completions(req: ChatAgentRequest, http_req: Request):
+async def chat_agent_completions(req: ChatAgentRequest, http_req: Request, credential: str = Depends(require_api_credential)):
     try:
-        authorization_header = http_req.headers.get("Authorization")
-        if not authorization_header:
-            return JSONResponse(status_code=401, content={
-                "msg": "Missing authorization header"
-            })
-        
-        if Utils.check_api_authentication(authorization_header):
+        conversation, new_turns = await conversation_store.resolve(req.chat_session_id, req.messages)
+        formatted_messages = await Utils.aformat_agent_messages(conversation)
 
-            formatted_messages = Utils.format_agent_messages(req.messages)
+        if not formatted_messages:
+            return JSONResponse(status_code=400, content={"error": "No messages provided"})
 
-            if not formatted_messages:
-                return JSONResponse(status_code=400, content={"error": "No messages provided"})
+        message_payload = {"messages": formatted_messages}
+        stream_format = resolve_stream_format(req.stream_format, http_req.headers.get("accept"))
 
-            message_payload = {"messages": formatted_messages}
-            
-            return StreamingResponse(streaming.agent_astreaming(chat_id=req.chat_session_id, message=message_payload, model_name=req.model_name, stream_mode="messages"), media_type="text/html")
-        else:
-            return JSONResponse(status_code=403, content={
-                "msg": "Invalid credential",
-            })
+        ticket = await admission_controller.acquire(credential)
+        events = streaming.agent_aevents(chat_id=req.chat_session_id, message=message_payload, model_name=req.model_name, stream_mode="messages", new_turns=new_turns)
+        return stream_response(streaming.render(events, stream_format), stream_format, http_req, "agent", ticket)
+    except (AdmissionRejected, AttachmentTooLarge):
+        raise
     except Exception as e:
         logger.error(f"An error occurred: {e} \n TRACEBACK: ", traceback.format_exc())
         return JSONResponse(
@@ -110,27 +175,22 @@ async def chat_agent_completions(req: ChatAgentRequest, http_req: Request):
         )
 
 @app.post(f"/{app_conf.api_ver_1}/chat/llm/completions")
-async def chat_llm_completions(req: ChatLLMRequest, http_req: Request):
+async def chat_llm_completions(req: ChatLLMRequest, http_req: Request, credential: str = Depends(require_api_credential)):
     try:
-        authorization_header = http_req.headers.get("Authorization")
-        if not authorization_header:
-            return JSONResponse(status_code=401, content={
-                "msg": "Missing authorization header"
-            })
-        
-        if Utils.check_api_authentication(authorization_header):
-            formatted_messages = Utils.format_agent_messages(req.messages)
+        conversation, new_turns = await conversation_store.resolve(req.chat_session_id, req.messages)
+        formatted_messages = await Utils.aformat_agent_messages(conversation)
 
-            if not formatted_messages:
-                return JSONResponse(status_code=400, content={"error": "No messages provided"})
-            
-            message_payload = {"messages": formatted_messages}
-
-            return StreamingResponse(streaming.llm_astreaming(chat_id=req.chat_session_id, message=message_payload, model_name=req.model_name), media_type="text/html")
-        else:
-            return JSONResponse(status_code=403, content={
-                "msg": "Invalid credential",
-            })
+        if not formatted_messages:
+            return JSONResponse(status_code=400, content={"error": "No messages provided"})
+        
+        message_payload = {"messages": formatted_messages}
+        stream_format = resolve_stream_format(req.stream_format, http_req.headers.get("accept"))
+
+        ticket = await admission_controller.acquire(credential)
+        events = streaming.llm_aevents(chat_id=req.chat_session_id, message=message_payload, model_name=req.model_name, new_turns=new_turns)
+        return stream_response(streaming.render(events, stream_format), stream_format, http_req, "llm", ticket)
+    except (AdmissionRejected, AttachmentTooLarge):
+        raise
     except Exception as e:
         logger.error(f"An error occurred: {e} \n TRACEBACK: ", traceback.format_exc())
         return JSONResponse(
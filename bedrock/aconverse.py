@@ -0,0 +1,119 @@
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from botocore.exceptions import ClientError
+from pydantic import Field
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_aws import ChatBedrockConverse
+# Private helpers of ChatBedrockConverse._stream, reused so both paths build the same requests and chunks
+from langchain_aws.chat_models.bedrock_converse import (
+    _apply_response_format,
+    _convert_tool_blocks_to_text,
+    _handle_bedrock_error,
+    _has_tool_use_or_result_blocks,
+    _messages_to_bedrock,
+    _parse_stream_event,
+    _raise_if_context_overflow,
+    _snake_to_camel_keys,
+)
+
+class AsyncChatBedrockConverse(ChatBedrockConverse):
+    """
+    ChatBedrockConverse whose `astream` reads the Converse event stream on the
+    event loop with an async (aiobotocore) client, instead of pulling every
+    event through an executor thread. Non-streaming calls keep the sync client.
+    """
+
+    async_client_provider: Optional[Callable[[], Awaitable[Any]]] = Field(default=None, exclude=True)
+    on_first_token: Optional[Callable[[float], None]] = Field(default=None, exclude=True)
+
+    def _stream_request(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+        """(messages, system, params) of a converse_stream call, built as ChatBedrockConverse._stream does."""
+        if self.raw_blocks is not None:
+            bedrock_messages, system = self.raw_blocks, []
+        else:
+            bedrock_messages, system = _messages_to_bedrock(
+                messages,
+                self.system,
+                model_id=self._get_base_model(),
+                provider=self.provider,
+            )
+            if self.guard_last_turn_only:
+                self._apply_guard_last_turn_only(bedrock_messages)
+
+        filtered_kwargs = {k: v for k, v in kwargs.items() if k != "disable_streaming"}
+        additional_fields = filtered_kwargs.pop("additional_model_request_fields", None)
+        reasoning_effort = filtered_kwargs.pop("reasoning_effort", None)
+        if reasoning_effort is not None:
+            effort_fields = self._reasoning_effort_fields(reasoning_effort)
+            if effort_fields:
+                additional_fields = {**effort_fields, **(additional_fields or {})}
+        _apply_response_format(filtered_kwargs)
+        cache_control = filtered_kwargs.pop("cache_control", None)
+        params = self._converse_params(
+            stop=stop,
+            additionalModelRequestFields=additional_fields,
+            **_snake_to_camel_keys(filtered_kwargs, excluded_keys={"inputSchema", "properties", "thinking"}),
+        )
+        self._apply_cache_points(cache_control, system, bedrock_messages, params)
+
+        if params.get("toolConfig") is None and _has_tool_use_or_result_blocks(bedrock_messages):
+            bedrock_messages = _convert_tool_blocks_to_text(bedrock_messages)
+        return bedrock_messages, system, params
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.async_client_provider is None:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+
+        bedrock_messages, system, params = self._stream_request(messages, stop, kwargs)
+        client = await self.async_client_provider()
+        started = time.perf_counter()
+        try:
+            response = await client.converse_stream(messages=bedrock_messages, system=system, **params)
+        except ClientError as e:
+            _handle_bedrock_error(e)
+
+        added_model_name = False
+        received_message_stop = False
+        first_token = True
+        stream = response["stream"]
+        try:
+            async for event in stream:
+                received_message_stop |= "messageStop" in event
+                if first_token and "contentBlockDelta" in event:
+                    first_token = False
+                    if self.on_first_token is not None:
+                        self.on_first_token((time.perf_counter() - started) * 1000)
+                message_chunk = _parse_stream_event(event)
+                if not message_chunk:
+                    continue
+                if getattr(message_chunk, "usage_metadata", None) and not added_model_name:
+                    message_chunk.response_metadata["model_name"] = self.base_model_id or self.model_id
+                    if "application-inference-profile" in self.model_id:
+                        message_chunk.response_metadata["inference_profile_id"] = self.model_id
+                    if metadata := response.get("ResponseMetadata"):
+                        message_chunk.response_metadata["ResponseMetadata"] = metadata
+                    added_model_name = True
+                message_chunk.response_metadata["model_provider"] = "bedrock_converse"
+                generation_chunk = ChatGenerationChunk(message=message_chunk)
+                if run_manager:
+                    await run_manager.on_llm_new_token(generation_chunk.text, chunk=generation_chunk)
+                yield generation_chunk
+        except ClientError as e:
+            _raise_if_context_overflow(e)
+            raise
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+
+        if not received_message_stop:
+            raise ConnectionError("Incomplete Bedrock response stream: missing messageStop event.")
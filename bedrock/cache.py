@@ -0,0 +1,91 @@
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Tuple
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import CacheConfig
+
+class AgentCache(object):
+    """
+    LRU cache of compiled agents.
+    Keyed by (model name, sorted enabled tool names, system-prompt hash); compiled
+    graphs are immutable so identical configurations can share one instance.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._build_locks: Dict[Tuple, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.build_time_ms = 0.0
+
+    @staticmethod
+    def make_key(model_name: str, tool_names: Iterable[str], system_prompt: str, *extra: Any) -> Tuple:
+        prompt_hash = hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest()
+        return (model_name, tuple(sorted(tool_names)), prompt_hash, *extra)
+
+    def _get(self, key: Tuple):
+        agent = self._entries.get(key)
+        if agent is not None:
+            self._entries.move_to_end(key)
+        return agent
+
+    async def get_or_build(self, key: Tuple, builder: Callable[[], Any]):
+        agent = self._get(key)
+        if agent is not None:
+            self.hits += 1
+            metrics.incr("agent_cache_hits_total")
+            return agent
+
+        lock = self._build_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another request may have built the same agent while we waited.
+            agent = self._get(key)
+            if agent is not None:
+                self.hits += 1
+                metrics.incr("agent_cache_hits_total")
+                return agent
+
+            self.misses += 1
+            metrics.incr("agent_cache_misses_total")
+
+            started = time.perf_counter()
+            agent = builder()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            self.builds += 1
+            self.build_time_ms += elapsed_ms
+            metrics.observe("agent_cache_build_ms", elapsed_ms)
+
+            self._entries[key] = agent
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("agent_cache_size", len(self._entries))
+
+        self._build_locks.pop(key, None)
+        return agent
+
+    def invalidate(self):
+        """Drop every cached agent, e.g. after tools, LLMs or agents were changed."""
+        if self._entries:
+            logger.info(f"[AgentCache] Invalidating {len(self._entries)} cached agent(s).")
+        self._entries.clear()
+        metrics.incr("agent_cache_invalidations_total")
+        metrics.set_gauge("agent_cache_size", 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "builds": self.builds,
+            "avg_build_ms": round(self.build_time_ms / self.builds, 3) if self.builds else 0,
+        }
+
+cache_conf = CacheConfig()
+agent_cache = AgentCache(max_size=int(cache_conf.agent_cache_max_size))
@@ -0,0 +1,90 @@
+import time
+import asyncio
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, List, Optional
+from helpers.loog import logger
+from helpers.metrics import metrics
+
+# Bedrock event streams opened while serving the current request.
+# The list is created before any worker task or executor thread is spawned,
+# so every copy of the context shares it.
+_open_streams: ContextVar[Optional[List[Any]]] = ContextVar("open_bedrock_streams", default=None)
+
+class StreamTrackingClient(object):
+    """bedrock-runtime client proxy that remembers `converse_stream` event streams so they can be closed early."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def converse_stream(self, **kwargs):
+        response = self._client.converse_stream(**kwargs)
+        streams = _open_streams.get()
+        if streams is not None and response.get("stream") is not None:
+            streams.append(response["stream"])
+        return response
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+def close_streams(streams: List[Any]):
+    for stream in streams:
+        try:
+            stream.close()
+        except Exception as e:
+            logger.warning(f"[Stream] Failed to close Bedrock event stream: {e}")
+    streams.clear()
+
+async def cancel_on_disconnect(
+    body: AsyncIterator[str],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: float,
+    endpoint: str,
+) -> AsyncGenerator[str, None]:
+    """
+    Relay `body`, checking every `poll_interval` seconds whether the client is
+    still connected. On disconnect the pending step is cancelled (model stream,
+    agent loop and in-flight tool calls) and open Bedrock event streams are closed.
+    """
+    streams: List[Any] = []
+    _open_streams.set(streams)
+    iterator = body.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    next_check = time.monotonic() + poll_interval
+    reason = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            done, _ = await asyncio.wait({pending}, timeout=max(next_check - time.monotonic(), 0))
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + poll_interval
+                if await is_disconnected():
+                    reason = "client_disconnect"
+                    return
+            if not done:
+                continue
+
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                return
+            finally:
+                pending = None
+            yield chunk
+    except (asyncio.CancelledError, GeneratorExit):
+        reason = "cancelled"
+        raise
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+        if reason:
+            close_streams(streams)
+            metrics.incr("stream_cancelled_total", endpoint=endpoint, reason=reason)
+            logger.info(f"[Stream] {endpoint} stream cancelled ({reason}).")
+        else:
+            streams.clear()
@@ -0,0 +1,156 @@
+import math
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+from langchain_core.messages import HumanMessage, SystemMessage
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import ContextConfig
+from bedrock.registry import model_registry
+
+# Rough per-item estimates; Bedrock does not expose a tokenizer for Claude.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+IMAGE_TOKENS = 1600
+DOCUMENT_BYTES_PER_TOKEN = 8
+
+SUMMARY_PROMPT = (
+    "Summarize the earlier part of this conversation for your own future reference. "
+    "Keep facts, decisions, names, numbers and open questions. Be concise."
+)
+
+def text_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """Estimate the input tokens of one formatted message ({"role", "content": [blocks]})."""
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    for block in message.get("content", []):
+        if block.get("type") == "text":
+            tokens += text_tokens(block.get("text", ""))
+        elif block.get("type") == "image":
+            tokens += IMAGE_TOKENS
+        elif "document" in block:
+            data = block["document"].get("source", {}).get("bytes") or b""
+            tokens += math.ceil(len(data) / DOCUMENT_BYTES_PER_TOKEN)
+    return tokens
+
+def message_text(message: Dict[str, Any]) -> str:
+    parts = []
+    for block in message.get("content", []):
+        if block.get("type") == "text":
+            parts.append(block.get("text", ""))
+        elif block.get("type") == "image":
+            parts.append("[image]")
+        elif "document" in block:
+            parts.append(f"[document: {block['document'].get('name', '')}]")
+    return "\n".join(parts)
+
+class ContextWindowManager(object):
+    """
+    Keeps the system prompt plus the most recent turns within a token budget.
+    The budget comes from `llms.context_max_tokens` of the model, falling back
+    to `default_budget`. Older turns are dropped, or in "summary" mode replaced
+    by a rolling summary cached by the hash chain of the turns it covers.
+    """
+
+    def __init__(self, default_budget: int, mode: str, summary_cache_size: int):
+        self.default_budget = default_budget
+        self.mode = mode
+        self.summary_cache_size = summary_cache_size
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+
+    async def budget(self, model_name: str) -> int:
+        """Token budget of a model: its `llms.context_max_tokens`, else the default."""
+        model = await model_registry.get(model_name)
+        return (model.spec.context_max_tokens if model else None) or self.default_budget
+
+    @staticmethod
+    def split(messages: List[Dict[str, Any]], system_prompt: str, budget: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+        """Return (dropped, kept, dropped_tokens); the latest message is always kept."""
+        available = budget - text_tokens(system_prompt)
+        kept_from = len(messages)
+        used = 0
+        for i in range(len(messages) - 1, -1, -1):
+            tokens = message_tokens(messages[i])
+            if kept_from < len(messages) and used + tokens > available:
+                break
+            used += tokens
+            kept_from = i
+
+        # The model expects the conversation to start with a user turn.
+        while kept_from < len(messages) - 1 and messages[kept_from]["role"] != "user":
+            kept_from += 1
+
+        dropped = messages[:kept_from]
+        return dropped, messages[kept_from:], sum(message_tokens(m) for m in dropped)
+
+    @staticmethod
+    def _prefix_digests(messages: List[Dict[str, Any]]) -> List[str]:
+        digests, current = [], ""
+        for message in messages:
+            current = hashlib.sha256(f"{current}|{message['role']}|{message_text(message)}".encode("utf-8")).hexdigest()
+            digests.append(current)
+        return digests
+
+    def _remember(self, digest: str, summary: str):
+        self._summaries[digest] = summary
+        self._summaries.move_to_end(digest)
+        while len(self._summaries) > self.summary_cache_size:
+            self._summaries.popitem(last=False)
+
+    async def summarize(self, dropped: List[Dict[str, Any]], llm) -> str:
+        """Summarize dropped turns, extending the longest already-summarized prefix."""
+        digests = self._prefix_digests(dropped)
+        if digests[-1] in self._summaries:
+            metrics.incr("context_summary_cache_hits_total")
+            return self._summaries[digests[-1]]
+
+        previous, start = "", 0
+        for i in range(len(digests) - 2, -1, -1):
+            if digests[i] in self._summaries:
+                previous, start = self._summaries[digests[i]], i + 1
+                break
+
+        transcript = "\n\n".join(f"{m['role']}: {message_text(m)}" for m in dropped[start:])
+        if previous:
+            transcript = f"Summary so far:\n{previous}\n\nNew turns:\n{transcript}"
+
+        metrics.incr("context_summary_cache_misses_total")
+        response = await llm.ainvoke([SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=transcript)])
+        summary = response.text if hasattr(response, "text") else str(response.content)
+        self._remember(digests[-1], summary)
+        return summary
+
+    async def apply(self, messages: List[Dict[str, Any]], system_prompt: str, budget: int, model_name: str, llm=None) -> List[Dict[str, Any]]:
+        """Return the messages to send so that the request fits within `budget` tokens."""
+        if budget <= 0 or not messages:
+            return messages
+
+        dropped, kept, dropped_tokens = self.split(messages, system_prompt, budget)
+        if not dropped:
+            return messages
+
+        metrics.incr("context_trimmed_tokens_total", dropped_tokens, model=model_name)
+        metrics.incr("context_trimmed_messages_total", len(dropped), model=model_name)
+        logger.info(f"[Context] Trimmed {len(dropped)} message(s), ~{dropped_tokens} tokens, for model {model_name} (budget {budget}).")
+
+        if self.mode != "summary" or llm is None:
+            return kept
+
+        try:
+            summary = await self.summarize(dropped, llm)
+        except Exception as e:
+            logger.error(f"[Context] Summarization failed, dropping old turns instead: {e}")
+            return kept
+
+        first = dict(kept[0])
+        first["content"] = [{"type": "text", "text": f"Summary of the earlier conversation:\n{summary}"}] + list(first["content"])
+        return [first] + kept[1:]
+
+context_conf = ContextConfig()
+context_manager = ContextWindowManager(
+    default_budget=int(context_conf.context_max_tokens),
+    mode=context_conf.context_trim_mode,
+    summary_cache_size=int(context_conf.context_summary_cache_size),
+)
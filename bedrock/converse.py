@@ -1,42 +1,37 @@
-import boto3
+from functools import partial
 from langchain_aws import ChatBedrockConverse
+from bedrock.aconverse import AsyncChatBedrockConverse
 from helpers.config import AppConfig, AWSConfig
+from bedrock.router import region_router
 
 class Converse():
     def __init__(self):
         self.aws_conf = AWSConfig()
-        self.bedrock_client = boto3.client("bedrock-runtime", region_name=self.aws_conf.aws_region)
+        self.router = region_router
 
-    def claude_model_text(self):
-        # guardrails = None
-
-        # if getattr(self.aws_conf, "bedrock_guardrail_enable", "").lower() == "enable":
-        #     guardrails = {
-        #         "guardrailIdentifier": self.aws_conf.bedrock_guardrail_id,
-        #         "guardrailVersion": self.aws_conf.bedrock_guardrail_version
-        #     }
-
-        converse = ChatBedrockConverse(
-            client=self.bedrock_client,
-            model=self.aws_conf.bedrock_model_claude_text_id,
-            temperature=self.aws_conf.bedrock_model_claude_text_temperature,
-            max_tokens=self.aws_conf.bedrock_model_claude_text_max_tokens,
-            guardrails={
-                "guardrailIdentifier": self.aws_conf.bedrock_guardrail_id,
-                "guardrailVersion": self.aws_conf.bedrock_guardrail_version
+    def model(self, spec, region: str) -> ChatBedrockConverse:
+        """Build the chat model of a registry ModelSpec in one region, on the shared client of that region."""
+        guardrails = None
+        if spec.guardrail_id:
+            guardrails = {
+                "guardrailIdentifier": spec.guardrail_id,
+                "guardrailVersion": spec.guardrail_version or "DRAFT",
             }
+
+        kwargs = dict(
+            client=self.router.client(region),
+            region_name=region,
+            model=spec.model_id,
+            temperature=spec.temperature,
+            max_tokens=spec.max_tokens,
+            guardrails=guardrails,
         )
+        if self.aws_conf.bedrock_client == "async":
+            return AsyncChatBedrockConverse(
+                **kwargs,
+                async_client_provider=partial(self.router.async_client, region),
+                on_first_token=partial(self.router.record_latency, spec.model_id, region),
+            )
+
+        converse = ChatBedrockConverse(**kwargs)
         return converse
-    
-    def claude_model_vision(self):
-        converse = ChatBedrockConverse(
-            client=self.bedrock_client,
-            model=self.aws_conf.bedkrock_model_claude_vision_id,
-            temperature=self.aws_conf.bedrock_model_claude_vision_temperature,
-            max_tokens=self.aws_conf.bedrock_model_claude_vision_max_tokens,
-            guardrails={
-                "guardrailIdentifier": self.aws_conf.bedrock_guardrail_id,
-                "guardrailVersion": self.aws_conf.bedrock_guardrail_version
-            }
-        )
-        return converse
\ No newline at end of file
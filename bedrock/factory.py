@@ -1,7 +1,12 @@
 import os
-from databases.crud import get_enabled_tools
-from databases.database import SessionLocal
-from bedrock.converse import Converse
+from typing import Optional
+from tools.registry import tool_registry
+from bedrock.cache import agent_cache, AgentCache
+from bedrock.middleware import ParallelToolCallsMiddleware
+from bedrock.router import RegionRoutingMiddleware, region_router
+from bedrock.registry import model_registry, ModelEntry
+from bedrock.prompt_cache import cached_system_prompt, cached_tools
+from helpers.config import AWSConfig, ToolConfig
 from langchain.agents import create_agent
 from tools.web_search import (
     DuckDuckGo,
@@ -15,6 +20,7 @@ from tools.web_search import (
     SearxSearch,
     OpenWeather,
 )
+from tools.knowledge_base import KnowledgeBase
 
 TOOL_CLASS_MAP = {
     "duckduckgo": DuckDuckGo,
@@ -26,7 +32,8 @@ TOOL_CLASS_MAP = {
     "asknews": AskNews,
     "reddit": RedditSearch,
     "searx": SearxSearch,
-    "openweather": OpenWeather
+    "openweather": OpenWeather,
+    "knowledge_base": KnowledgeBase,
 }
 
 class PromptFactory:
@@ -53,63 +60,79 @@ class AgentFactory:
     """Factory for creating LangChain agents with dynamically enabled tools."""
 
     def __init__(self):
-        self.chat_converse = Converse()
+        self.tool_conf = ToolConfig()
+        self.aws_conf = AWSConfig()
         self.GENERAL_ASSISTANT_PROMPT = PromptFactory.load_agent_prompt()
 
+    def build_middleware(self, models_by_region: dict) -> list:
+        """Middleware shared by every agent built by this factory."""
+        return [
+            RegionRoutingMiddleware(region_router, models_by_region),
+            ParallelToolCallsMiddleware(
+                max_parallel=int(self.tool_conf.tool_step_max_parallel),
+                step_time_budget=float(self.tool_conf.tool_step_time_budget),
+            ),
+        ]
+
     async def get_enabled_tools(self):
-        """Fetch all enabled tools from the DB and return a list of tool classes."""
+        """Return the tool classes of all enabled tools from the in-memory tool registry."""
         tools = []
-        async with SessionLocal() as session:
-            db_tools = await get_enabled_tools(session)
-
-            for t in db_tools:
-                tool_cls = TOOL_CLASS_MAP.get(t.name)
-                if tool_cls:
-                    tools.append(tool_cls)
+        for t in await tool_registry.enabled():
+            tool_cls = TOOL_CLASS_MAP.get(t.name)
+            if tool_cls:
+                tools.append(tool_cls)
 
         return tools
+
+    def prompt_cache_enabled(self, model: ModelEntry) -> bool:
+        """Per-LLM prompt caching setting, falling back to the env default."""
+        if model.spec.prompt_cache is not None:
+            return model.spec.prompt_cache
+        return self.aws_conf.bedrock_model_claude_text_prompt_cache == "enable"
     
-    async def agent(self, model_name: str):
-        """Create and return an LLM agent with appropriate model and tools."""
-        model_name = (model_name or "").lower()
+    def agent_prompt(self, model: Optional[ModelEntry]) -> str:
+        """System prompt of the agent: the model's own prompt from the registry, else the file default."""
+        return (model.spec.system_prompt if model else None) or self.GENERAL_ASSISTANT_PROMPT
 
-        if model_name == "claude":
-            llm = self.chat_converse.claude_model_text()
-        elif model_name == "llama":
-            # llm = self.chat_converse.titan_model_text()
-            return None
-        elif model_name == "gpt-oss":
-            # llm = self.chat_converse.mistral_model_text()
+    async def agent(self, model_name: str):
+        """Create and return an LLM agent for a registered model, or None if the model is unknown."""
+        model = await model_registry.get(model_name)
+        if model is None:
             return None
-        else:
-            raise ValueError(f"[Agent] Unsupported model: {model_name}")
 
         active_tools = await self.get_enabled_tools()
+        prompt_cache = self.prompt_cache_enabled(model)
+        system_prompt = self.agent_prompt(model)
 
-        # Create the LangChain agent
-        return create_agent(
-            system_prompt=self.GENERAL_ASSISTANT_PROMPT,
-            tools=active_tools,
-            model=llm,
+        cache_key = AgentCache.make_key(
+            model.spec.name.lower(),
+            [t.name for t in active_tools],
+            system_prompt,
+            prompt_cache,
+            model.spec,
         )
 
+        def build_agent():
+            # The routing middleware picks one of the model's regional instances for each model call
+            return create_agent(
+                system_prompt=cached_system_prompt(system_prompt, prompt_cache),
+                tools=cached_tools(active_tools, prompt_cache),
+                model=model.llm(),
+                middleware=self.build_middleware(model.llms),
+            )
+
+        # Create the LangChain agent (or reuse the compiled one)
+        return await agent_cache.get_or_build(cache_key, build_agent)
+
 class LLMFactory:
     def __init__(self):
-        self.chat_converse = Converse()
-    
-    def llm(self, model_name: str):
-        """Create and return an LLM model."""
-        model_name = (model_name or "").lower()
+        pass
 
-        if model_name == "claude":
-            llm = self.chat_converse.claude_model_text()
-        elif model_name == "llama":
-            # llm = self.chat_converse.titan_model_text()
-            return None
-        elif model_name == "gpt-oss":
-            # llm = self.chat_converse.mistral_model_text()
-            return None
-        else:
-            raise ValueError(f"[Agent] Unsupported model: {model_name}")
-        
-        return llm
\ No newline at end of file
+    async def model(self, model_name: str) -> Optional[ModelEntry]:
+        """Return the registered model, or None if the model is unknown."""
+        return await model_registry.get(model_name)
+
+    async def llm(self, model_name: str, region: Optional[str] = None):
+        """Return the chat model of a registered model in `region` (default: its first region)."""
+        model = await model_registry.get(model_name)
+        return model.llm(region) if model else None
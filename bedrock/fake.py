@@ -0,0 +1,139 @@
+import time
+import random
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from botocore.exceptions import ClientError
+
+class FakeEventStream(object):
+    """Iterable of Converse stream events with the `close()` of botocore's EventStream."""
+
+    def __init__(self, events: Iterator[Dict[str, Any]]):
+        self._events = events
+        self.closed = False
+
+    def __iter__(self):
+        for event in self._events:
+            if self.closed:
+                return
+            yield event
+
+    def close(self):
+        self.closed = True
+
+class FakeBedrockRuntime(object):
+    """
+    Offline stand-in for the bedrock-runtime client (BEDROCK_BACKEND=fake).
+    Streams a canned answer word by word with configurable latency, and can
+    fail the next calls with scripted errors or throttle a share of them.
+    """
+
+    def __init__(
+        self,
+        region_name: str = "fake-region",
+        answer: str = "This is a response from the fake Bedrock runtime.",
+        first_token_latency: float = 0.05,
+        token_latency: float = 0.005,
+        throttle_rate: float = 0.0,
+    ):
+        self.region_name = region_name
+        self.answer = answer
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+        self._failures: List[str] = []
+        self._lock = threading.Lock()
+
+    def fail_next(self, *codes: str):
+        """Make the next calls raise ClientErrors with these codes, in order."""
+        with self._lock:
+            self._failures.extend(codes)
+
+    @staticmethod
+    def client_error(code: str, operation: str) -> ClientError:
+        status = 429 if code == "ThrottlingException" else 503
+        return ClientError({"Error": {"Code": code, "Message": f"Fake {code}"}, "ResponseMetadata": {"HTTPStatusCode": status}}, operation)
+
+    def _before_call(self, operation: str):
+        with self._lock:
+            self.calls += 1
+            code = self._failures.pop(0) if self._failures else None
+        if code is None and self.throttle_rate and random.random() < self.throttle_rate:
+            code = "ThrottlingException"
+        if code:
+            raise self.client_error(code, operation)
+
+    @staticmethod
+    def _input_tokens(kwargs: Dict[str, Any]) -> int:
+        chars = sum(len(b.get("text", "")) for b in kwargs.get("system", []) or [])
+        for message in kwargs.get("messages", []):
+            chars += sum(len(b.get("text", "")) for b in message.get("content", []))
+        return max(1, chars // 4)
+
+    def _usage(self, kwargs: Dict[str, Any]) -> Dict[str, int]:
+        input_tokens = self._input_tokens(kwargs)
+        output_tokens = len(self.answer.split())
+        return {"inputTokens": input_tokens, "outputTokens": output_tokens, "totalTokens": input_tokens + output_tokens}
+
+    def event_plan(self, kwargs: Dict[str, Any]) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        """(delay before the event, event) pairs of one Converse stream."""
+        yield 0.0, {"messageStart": {"role": "assistant"}}
+        for i, word in enumerate(self.answer.split(" ")):
+            delay = self.first_token_latency if i == 0 else self.token_latency
+            yield delay, {"contentBlockDelta": {"delta": {"text": word if i == 0 else f" {word}"}, "contentBlockIndex": 0}}
+        yield 0.0, {"contentBlockStop": {"contentBlockIndex": 0}}
+        yield 0.0, {"messageStop": {"stopReason": "end_turn"}}
+        yield 0.0, {"metadata": {"usage": self._usage(kwargs), "metrics": {"latencyMs": int(self.first_token_latency * 1000)}}}
+
+    def _events(self, kwargs: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        for delay, event in self.event_plan(kwargs):
+            if delay:
+                time.sleep(delay)
+            yield event
+
+    def converse_stream(self, **kwargs) -> Dict[str, Any]:
+        self._before_call("ConverseStream")
+        return {"stream": FakeEventStream(self._events(kwargs)), "ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    def converse(self, **kwargs) -> Dict[str, Any]:
+        self._before_call("Converse")
+        time.sleep(self.first_token_latency)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": self.answer}]}},
+            "stopReason": "end_turn",
+            "usage": self._usage(kwargs),
+            "metrics": {"latencyMs": int(self.first_token_latency * 1000)},
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+        }
+
+class AsyncFakeEventStream(object):
+    """Async iterable counterpart of FakeEventStream, as returned by aiobotocore."""
+
+    def __init__(self, plan: Iterator[Tuple[float, Dict[str, Any]]]):
+        self._plan = plan
+        self.closed = False
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        for delay, event in self._plan:
+            if delay:
+                await asyncio.sleep(delay)
+            if self.closed:
+                return
+            yield event
+
+    def close(self):
+        self.closed = True
+
+class AsyncFakeBedrockRuntime(object):
+    """aiobotocore-style front for a FakeBedrockRuntime; shares its scripted failures and call count."""
+
+    def __init__(self, fake: FakeBedrockRuntime):
+        self.fake = fake
+
+    async def converse_stream(self, **kwargs) -> Dict[str, Any]:
+        self.fake._before_call("ConverseStream")
+        return {"stream": AsyncFakeEventStream(self.fake.event_plan(kwargs)), "ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    async def converse(self, **kwargs) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.fake.converse, **kwargs)
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from helpers.loog import logger
+from helpers.metrics import metrics
+from bedrock.retriever import Passage, RetrieverKB
+
+VECTORS_FILE = "vectors.f32"
+ASSIGN_FILE = "assign.i32"
+OFFSETS_FILE = "offsets.u64"
+CHUNKS_FILE = "chunks.jsonl"
+CENTROIDS_FILE = "centroids.npy"
+META_FILE = "meta.json"
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty lists with random points
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+class LocalVectorIndex(object):
+    """
+    Append-only vector index of one knowledge base, stored in a directory:
+    unit float32 vectors and IVF list assignments in raw memory-mapped files,
+    chunk text as JSON lines addressed through a memory-mapped offset table.
+
+    Search is a blocked brute-force scan, or, once `train_ivf` has run, a scan
+    of the `nprobe` inverted lists closest to the query. Appends are assigned
+    to the nearest existing centroid, so the index never needs a full rebuild;
+    re-train only when the data distribution has drifted.
+    """
+
+    BLOCK_ROWS = 65536
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self.count = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._vectors: Optional[np.memmap] = None
+        self._assign: Optional[np.memmap] = None
+        self._offsets: Optional[np.memmap] = None
+        # Inverted lists as CSR over rows [0, _lists_rows); newer rows are scanned from `_assign`
+        self._list_rows: Optional[np.ndarray] = None
+        self._list_starts: Optional[np.ndarray] = None
+        self._lists_rows = 0
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta_path = self._file(META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["dim"] != self.dim:
+                raise ValueError(f"Index {self.path} has dim {meta['dim']}, expected {self.dim}")
+            self.count = meta["count"]
+        if os.path.exists(self._file(CENTROIDS_FILE)):
+            self.centroids = np.load(self._file(CENTROIDS_FILE))
+        self._remap()
+
+    def _save_meta(self):
+        tmp = self._file(META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "count": self.count, "nlist": 0 if self.centroids is None else len(self.centroids)}, f)
+        os.replace(tmp, self._file(META_FILE))
+
+    def _remap(self):
+        if self.count == 0:
+            self._vectors = self._assign = self._offsets = None
+            return
+        self._vectors = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        self._offsets = np.memmap(self._file(OFFSETS_FILE), dtype=np.uint64, mode="r", shape=(self.count,))
+        if self.centroids is not None:
+            self._assign = np.memmap(self._file(ASSIGN_FILE), dtype=np.int32, mode="r", shape=(self.count,))
+
+    def _assign_rows(self, vectors: np.ndarray) -> np.ndarray:
+        assign = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), self.BLOCK_ROWS):
+            block = vectors[start:start + self.BLOCK_ROWS]
+            assign[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return assign
+
+    def add(self, vectors: np.ndarray, chunks: Sequence[Dict[str, Any]]):
+        """Append vectors with their chunks ({"text", "source", "metadata"})."""
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        if len(vectors) != len(chunks):
+            raise ValueError("vectors and chunks must have the same length")
+        if len(vectors) == 0:
+            return
+
+        with self._lock:
+            with open(self._file(CHUNKS_FILE), "ab") as f:
+                offset = f.tell()
+                offsets = np.empty(len(chunks), dtype=np.uint64)
+                for i, chunk in enumerate(chunks):
+                    line = (json.dumps(chunk, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                    offsets[i] = offset
+                    f.write(line)
+                    offset += len(line)
+            with open(self._file(OFFSETS_FILE), "ab") as f:
+                f.write(offsets.tobytes())
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                f.write(vectors.tobytes())
+            if self.centroids is not None:
+                with open(self._file(ASSIGN_FILE), "ab") as f:
+                    f.write(self._assign_rows(vectors).tobytes())
+            self.count += len(vectors)
+            self._save_meta()
+            self._remap()
+
+    def train_ivf(self, nlist: int, sample_size: int = 50000, iterations: int = 10):
+        """Cluster the vectors into `nlist` inverted lists and assign every row."""
+        with self._lock:
+            if self.count < nlist:
+                raise ValueError(f"Need at least {nlist} vectors to train {nlist} lists, have {self.count}")
+            rng = np.random.default_rng(0)
+            sample = np.asarray(self._vectors[np.sort(rng.choice(self.count, size=min(sample_size, self.count), replace=False))])
+            self.centroids = kmeans(sample, nlist, iterations)
+            np.save(self._file(CENTROIDS_FILE), self.centroids)
+            assign = np.empty(self.count, dtype=np.int32)
+            for start in range(0, self.count, self.BLOCK_ROWS):
+                assign[start:start + self.BLOCK_ROWS] = self._assign_rows(np.asarray(self._vectors[start:start + self.BLOCK_ROWS]))
+            assign.tofile(self._file(ASSIGN_FILE))
+            self._list_rows = None
+            self._save_meta()
+            self._remap()
+
+    def _build_lists(self):
+        assign = np.asarray(self._assign)
+        self._list_rows = np.argsort(assign, kind="stable").astype(np.int64)
+        counts = np.bincount(assign, minlength=len(self.centroids))
+        self._list_starts = np.concatenate(([0], np.cumsum(counts)))
+        self._lists_rows = self.count
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        # Rebuild the inverted lists once appends since the last build exceed 10% of the index
+        if self._list_rows is None or self.count - self._lists_rows > 0.1 * self.count:
+            self._build_lists()
+        probe = top_k(self.centroids @ query, nprobe)
+        parts = [self._list_rows[self._list_starts[c]:self._list_starts[c + 1]] for c in probe]
+        if self._lists_rows < self.count:
+            tail = np.asarray(self._assign[self._lists_rows:])
+            parts.append(self._lists_rows + np.flatnonzero(np.isin(tail, probe)))
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(row, cosine score) of the k best rows; IVF when trained and `nprobe` is set, else brute force."""
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, self.dim))[0]
+        with self._lock:
+            if self.count == 0:
+                return []
+            if nprobe and self.centroids is not None:
+                rows = self._candidates(query, nprobe)
+                if len(rows) == 0:
+                    return []
+                scores = self._vectors[rows] @ query
+                best = top_k(scores, k)
+                return [(int(rows[i]), float(scores[i])) for i in best]
+
+            best_rows = np.empty(0, dtype=np.int64)
+            best_scores = np.empty(0, dtype=np.float32)
+            for start in range(0, self.count, self.BLOCK_ROWS):
+                scores = self._vectors[start:start + self.BLOCK_ROWS] @ query
+                idx = top_k(scores, k)
+                best_rows = np.concatenate((best_rows, start + idx))
+                best_scores = np.concatenate((best_scores, scores[idx]))
+            best = top_k(best_scores, k)
+            return [(int(best_rows[i]), float(best_scores[i])) for i in best]
+
+    def chunks(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        result = []
+        with open(self._file(CHUNKS_FILE), "rb") as f:
+            for row in rows:
+                f.seek(int(self._offsets[row]))
+                result.append(json.loads(f.readline()))
+        return result
+
+class LocalRetrieverKB(RetrieverKB):
+    """
+    RetrieverKB over local LocalVectorIndex directories (`<root>/<kb_id>`),
+    for offline runs, tests and benchmarks (KB_BACKEND=local).
+    Without configured ids it searches every index under the root.
+    """
+
+    def __init__(self, root: str, embeddings, dim: int, nprobe: int, ivf_min_rows: int, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        self.embeddings = embeddings
+        self.dim = dim
+        self.nprobe = nprobe
+        self.ivf_min_rows = ivf_min_rows
+        self._indexes: Dict[str, LocalVectorIndex] = {}
+        # index() runs on worker threads; two of them must not load the same directory twice
+        self._indexes_lock = threading.Lock()
+
+    def index(self, kb_id: str) -> LocalVectorIndex:
+        index = self._indexes.get(kb_id)
+        if index is None:
+            with self._indexes_lock:
+                index = self._indexes.get(kb_id)
+                if index is None:
+                    index = self._indexes[kb_id] = LocalVectorIndex(os.path.join(self.root, kb_id), self.dim)
+        return index
+
+    def exists(self, kb_id: str) -> bool:
+        """Whether a knowledge base has been built locally, without creating its directory."""
+        return kb_id in self._indexes or os.path.exists(os.path.join(self.root, kb_id, META_FILE))
+
+    async def kb_ids(self) -> List[str]:
+        ids = await super().kb_ids()
+        if ids or not os.path.isdir(self.root):
+            return ids
+        return sorted(d for d in os.listdir(self.root) if os.path.exists(os.path.join(self.root, d, META_FILE)))
+
+    def add_texts(self, kb_id: str, texts: List[str], sources: Optional[List[Optional[str]]] = None,
+                  metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Embed and append chunks to a knowledge base (blocking)."""
+        sources = sources or [None] * len(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        chunks = [{"text": t, "source": s, "metadata": m} for t, s, m in zip(texts, sources, metadatas)]
+        index = self.index(kb_id)
+        index.add(vectors, chunks)
+        if index.centroids is None and index.count >= self.ivf_min_rows:
+            nlist = int(4 * np.sqrt(index.count))
+            started = time.perf_counter()
+            index.train_ivf(nlist)
+            logger.info(f"[KB] Trained {nlist} lists for {kb_id} ({index.count} chunks) in {time.perf_counter() - started:.1f}s.")
+
+    async def _retrieve(self, kb_id: str, query: str) -> List[Passage]:
+        if not self.exists(kb_id):
+            return []  # e.g. a Bedrock KB id from an agents row with no local copy
+        vector = np.asarray(await self.embeddings.aembed_query(query), dtype=np.float32)
+
+        def search() -> List[Passage]:
+            index = self.index(kb_id)
+            nprobe = self.nprobe if index.count >= self.ivf_min_rows else None
+            hits = index.search(vector, self.results_per_kb, nprobe=nprobe)
+            chunks = index.chunks([row for row, _ in hits])
+            return [Passage(kb_id=kb_id, text=c["text"], score=score, source=c.get("source"), metadata=c.get("metadata") or {})
+                    for (_, score), c in zip(hits, chunks)]
+
+        started = time.perf_counter()
+        # NumPy releases the GIL in the matrix products, so other requests keep running
+        passages = await asyncio.to_thread(search)
+        metrics.observe("kb_local_search_ms", (time.perf_counter() - started) * 1000, kb=kb_id)
+        return passages
@@ -0,0 +1,116 @@
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, ToolMessage
+from helpers.loog import logger
+from helpers.metrics import metrics
+
+def _state_messages(state: Any) -> List[Any]:
+    if isinstance(state, dict):
+        return state.get("messages", [])
+    return getattr(state, "messages", []) or []
+
+@dataclass
+class _StepBudget(object):
+    semaphore: asyncio.Semaphore
+    deadline: float
+    remaining: int
+    started: float = field(default_factory=time.monotonic)
+
+class ParallelToolCallsMiddleware(AgentMiddleware):
+    """
+    Bounds the tool calls the model emits in a single assistant turn.
+    The agent already dispatches them concurrently; this caps how many run at
+    once, enforces a shared time budget for the whole step, and hands the
+    results back to the model in the order the calls were issued.
+    """
+
+    def __init__(self, max_parallel: int, step_time_budget: float):
+        super().__init__()
+        self.max_parallel = max_parallel
+        self.step_time_budget = step_time_budget
+        self._steps: Dict[Tuple[str, ...], _StepBudget] = {}
+
+    @staticmethod
+    def _step_key(request) -> Tuple[str, ...]:
+        call_id = request.tool_call.get("id")
+        for message in reversed(_state_messages(request.state)):
+            if isinstance(message, AIMessage) and message.tool_calls:
+                ids = tuple(c.get("id") for c in message.tool_calls)
+                if call_id in ids:
+                    return ids
+        return (call_id,)
+
+    def _enter_step(self, key: Tuple[str, ...]) -> _StepBudget:
+        step = self._steps.get(key)
+        if step is None:
+            step = self._steps[key] = _StepBudget(
+                semaphore=asyncio.Semaphore(self.max_parallel),
+                deadline=time.monotonic() + self.step_time_budget,
+                remaining=len(key),
+            )
+        return step
+
+    def _leave_step(self, key: Tuple[str, ...], step: _StepBudget):
+        step.remaining -= 1
+        if step.remaining <= 0 and self._steps.pop(key, None) is not None:
+            metrics.observe("agent_tool_step_ms", (time.monotonic() - step.started) * 1000, calls=len(key))
+
+    @staticmethod
+    def _budget_exceeded(request) -> ToolMessage:
+        name = request.tool_call.get("name")
+        metrics.incr("agent_tool_step_budget_exceeded_total", tool=name)
+        logger.warning(f"[Agent] Tool call {name} dropped: step time budget exceeded.")
+        return ToolMessage(
+            content=f"[{name}] Tool error: step time budget exceeded",
+            name=name,
+            tool_call_id=request.tool_call.get("id"),
+            status="error",
+        )
+
+    @staticmethod
+    async def _run_bounded(step: _StepBudget, request, handler):
+        async with step.semaphore:
+            return await handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        key = self._step_key(request)
+        step = self._enter_step(key)
+        try:
+            remaining = step.deadline - time.monotonic()
+            if remaining <= 0:
+                return self._budget_exceeded(request)
+            try:
+                return await asyncio.wait_for(self._run_bounded(step, request, handler), timeout=remaining)
+            except asyncio.TimeoutError:
+                return self._budget_exceeded(request)
+        finally:
+            self._leave_step(key, step)
+
+    @staticmethod
+    def _order_tool_results(messages: List[Any]) -> List[Any]:
+        """Reorder the trailing ToolMessages to follow the tool_calls order of their AIMessage."""
+        tail_start = len(messages)
+        while tail_start > 0 and isinstance(messages[tail_start - 1], ToolMessage):
+            tail_start -= 1
+        if tail_start == len(messages) or tail_start == 0:
+            return messages
+
+        issuer = messages[tail_start - 1]
+        if not isinstance(issuer, AIMessage) or not issuer.tool_calls:
+            return messages
+
+        order = {c.get("id"): i for i, c in enumerate(issuer.tool_calls)}
+        tail = messages[tail_start:]
+        ordered_tail = sorted(tail, key=lambda m: order.get(m.tool_call_id, len(order)))
+        if ordered_tail == tail:
+            return messages
+        return messages[:tail_start] + ordered_tail
+
+    async def awrap_model_call(self, request, handler):
+        ordered = self._order_tool_results(request.messages)
+        if ordered is not request.messages:
+            request = request.override(messages=ordered)
+        return await handler(request)
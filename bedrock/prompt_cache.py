@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import SystemMessage
+from helpers.metrics import metrics
+
+# Bedrock caches the request prefix up to each checkpoint (tools -> system -> messages).
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+def cached_system_prompt(prompt: str, enabled: bool) -> SystemMessage:
+    """System prompt with a cache checkpoint after it when prompt caching is enabled."""
+    if not enabled:
+        return SystemMessage(content=prompt)
+    return SystemMessage(content=[{"type": "text", "text": prompt}, dict(CACHE_POINT)])
+
+def cached_tools(tools: List[Any], enabled: bool) -> List[Any]:
+    """
+    Tool list with a cache checkpoint after the tool definitions.
+    The checkpoint is passed as a provider tool, which `create_agent` appends after
+    the regular tools and ChatBedrockConverse forwards as-is to `toolConfig.tools`.
+    """
+    if not enabled or not tools:
+        return tools
+    return list(tools) + [dict(CACHE_POINT)]
+
+def record_usage(model_name: str, usage: Optional[Dict[str, Any]], first_token_ms: Optional[float] = None):
+    """Record input/output and prompt-cache token counts from a response's usage metadata."""
+    if not usage:
+        return
+
+    details = usage.get("input_token_details") or {}
+    cache_read = details.get("cache_read", 0) or 0
+    cache_write = details.get("cache_creation", 0) or 0
+
+    metrics.incr("bedrock_input_tokens_total", usage.get("input_tokens", 0) or 0, model=model_name)
+    metrics.incr("bedrock_output_tokens_total", usage.get("output_tokens", 0) or 0, model=model_name)
+    metrics.incr("bedrock_cache_read_tokens_total", cache_read, model=model_name)
+    metrics.incr("bedrock_cache_write_tokens_total", cache_write, model=model_name)
+
+    outcome = "hit" if cache_read else ("write" if cache_write else "miss")
+    metrics.incr("bedrock_prompt_cache_requests_total", model=model_name, outcome=outcome)
+    if first_token_ms is not None:
+        metrics.observe("bedrock_first_token_ms", first_token_ms, model=model_name, cache=outcome)
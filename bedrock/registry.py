@@ -0,0 +1,187 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import select, func
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import AWSConfig, CacheConfig, DatabaseConfig
+from databases import models
+from databases.crud import get_llms
+from databases.database import SessionLocal
+from bedrock.converse import Converse
+from bedrock.router import parse_regions, region_router
+
+ENV_MODEL_NAME = "claude"
+
+@dataclass(frozen=True)
+class ModelSpec(object):
+    """Detached, read-only copy of an `llms` row; None means "use the env default"."""
+
+    name: str
+    model_id: str
+    regions: Tuple[str, ...]
+    max_tokens: int
+    temperature: float
+    guardrail_id: Optional[str] = None
+    guardrail_version: Optional[str] = None
+    system_prompt: Optional[str] = None
+    context_max_tokens: Optional[int] = None
+    prompt_cache: Optional[bool] = None
+
+    @classmethod
+    def from_model(cls, llm: models.LLMModel) -> "ModelSpec":
+        return cls(
+            name=llm.name,
+            model_id=llm.model_id,
+            regions=parse_regions(llm.region) or region_router.default_regions,
+            max_tokens=int(llm.model_max_tokens or 2048),
+            temperature=float(llm.model_temperature or 0.7),
+            guardrail_id=llm.guardrail_id or None,
+            guardrail_version=llm.guardrail_version or None,
+            system_prompt=llm.system_prompt or None,
+            context_max_tokens=int(llm.context_max_tokens) if llm.context_max_tokens else None,
+            prompt_cache=(llm.prompt_cache == "enable") if llm.prompt_cache else None,
+        )
+
+    @classmethod
+    def from_env(cls, aws_conf: AWSConfig) -> "ModelSpec":
+        """The `claude` model configured through BEDROCK_MODEL_CLAUDE_TEXT_* env vars."""
+        return cls(
+            name=ENV_MODEL_NAME,
+            model_id=aws_conf.bedrock_model_claude_text_id,
+            regions=region_router.default_regions,
+            max_tokens=int(aws_conf.bedrock_model_claude_text_max_tokens),
+            temperature=float(aws_conf.bedrock_model_claude_text_temperature),
+            guardrail_id=aws_conf.bedrock_guardrail_id or None,
+            guardrail_version=aws_conf.bedrock_guardrail_version or None,
+        )
+
+class ModelEntry(object):
+    """A registered model with one ready-to-use ChatBedrockConverse per region."""
+
+    def __init__(self, spec: ModelSpec, llms: Dict[str, Any]):
+        self.spec = spec
+        self.llms = llms
+
+    @property
+    def regions(self) -> Tuple[str, ...]:
+        return tuple(self.llms)
+
+    def llm(self, region: Optional[str] = None):
+        return self.llms[region or self.spec.regions[0]]
+
+class ModelRegistry(object):
+    """
+    Process-wide view of the `llms` table, keyed by lower-cased model name.
+    Chat models are built once per row and region and reused until the row
+    changes. Reloaded after `/llms` writes, with a periodic fingerprint poll to
+    pick up writes made through other workers. The env-configured `claude`
+    model is kept as a fallback unless a row takes that name.
+    """
+
+    def __init__(self, converse: Converse, persist: bool, poll_interval: float):
+        self.converse = converse
+        self.persist = persist
+        self.poll_interval = poll_interval
+        self._models: Dict[str, ModelEntry] = {}
+        self._fingerprint = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._poll_task: Optional[asyncio.Task] = None
+
+    def _build(self, spec: ModelSpec) -> Optional[ModelEntry]:
+        if not spec.model_id:
+            logger.warning(f"[ModelRegistry] Model '{spec.name}' has no model_id, skipped.")
+            return None
+        previous = self._models.get(spec.name.lower())
+        if previous is not None and previous.spec == spec:
+            return previous
+        return ModelEntry(spec, {region: self.converse.model(spec, region) for region in spec.regions})
+
+    async def _read_fingerprint(self, session):
+        result = await session.execute(
+            select(
+                func.count(models.LLMModel.id),
+                func.max(func.coalesce(models.LLMModel.updated_at, models.LLMModel.created_at)),
+            )
+        )
+        return tuple(result.one())
+
+    async def reload(self):
+        """Reload every model and swap the in-memory view; unchanged models keep their instances."""
+        async with self._lock:
+            specs = [ModelSpec.from_env(self.converse.aws_conf)]
+            fingerprint = None
+            if self.persist:
+                async with SessionLocal() as session:
+                    db_llms = await get_llms(session)
+                    fingerprint = await self._read_fingerprint(session)
+                for llm in db_llms:
+                    # One bad row must not block every other model change
+                    try:
+                        specs.append(ModelSpec.from_model(llm))
+                    except (TypeError, ValueError) as e:
+                        metrics.incr("model_registry_invalid_rows_total")
+                        logger.error(f"[ModelRegistry] Skipped model '{llm.name}' with invalid settings: {e}")
+
+            entries: Dict[str, ModelEntry] = {}
+            for spec in specs:
+                entry = self._build(spec)
+                if entry is not None:
+                    entries[spec.name.lower()] = entry
+            self._models = entries
+            self._fingerprint = fingerprint
+            self._loaded = True
+        logger.info(f"[ModelRegistry] Loaded {len(self._models)} model(s).")
+
+    async def _safe_reload(self):
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.error(f"[ModelRegistry] Reload failed: {e}")
+            if not self._loaded:
+                # Serve the env model until the database is reachable
+                entry = self._build(ModelSpec.from_env(self.converse.aws_conf))
+                self._models = {ENV_MODEL_NAME: entry} if entry else {}
+                self._loaded = True
+
+    async def _ensure_loaded(self):
+        if not self._loaded:
+            await self._safe_reload()
+
+    async def get(self, model_name: str) -> Optional[ModelEntry]:
+        await self._ensure_loaded()
+        return self._models.get((model_name or "").lower())
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                async with SessionLocal() as session:
+                    fingerprint = await self._read_fingerprint(session)
+                if fingerprint != self._fingerprint:
+                    await self.reload()
+            except Exception as e:
+                logger.error(f"[ModelRegistry] Poll failed: {e}")
+
+    async def start(self):
+        await self._safe_reload()
+        if self.persist and self._poll_task is None and self.poll_interval > 0:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+
+db_conf = DatabaseConfig()
+cache_conf = CacheConfig()
+model_registry = ModelRegistry(
+    converse=Converse(),
+    persist=db_conf.db_enable == "enable",
+    poll_interval=float(cache_conf.model_registry_poll_interval),
+)
@@ -0,0 +1,219 @@
+import re
+import json
+import time
+import asyncio
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import AWSConfig, ResponseCacheConfig
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split()).casefold()
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> Optional[List[Tuple[str, str]]]:
+    """(role, normalized text) pairs, or None when a message carries attachments."""
+    normalized = []
+    for message in messages:
+        texts = []
+        for block in message.get("content", []):
+            if block.get("type") != "text":
+                return None
+            texts.append(block.get("text", ""))
+        normalized.append((message["role"], normalize_text("\n".join(texts))))
+    return normalized
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class LocalHashingEmbeddings(object):
+    """
+    Offline stand-in for a text embedding model.
+    Hashes word unigrams and character trigrams into a fixed-size signed vector,
+    which is enough to match rephrasings that share most of their wording, but
+    not to tell apart texts that differ in one word ("enable" vs "disable"), so
+    the response cache only uses it with the semantic tier off.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD.findall(normalize_text(text))
+        grams = []
+        for word in words:
+            padded = f"#{word}#"
+            grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return words + grams
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return vector.tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+@dataclass
+class _Entry(object):
+    slot: int
+    answer: str
+    expires_at: float
+
+class ResponseCache(object):
+    """
+    Cache of finished LLM answers with two tiers:
+    - exact: hash of (model, system prompt, normalized messages)
+    - semantic: cosine similarity of the last user message embedding, restricted
+      to entries with the same model, system prompt and prior conversation.
+    Entries expire after `ttl` seconds; the least recently used one is evicted
+    when `max_entries` is reached. Vectors live in a preallocated numpy matrix.
+    """
+
+    def __init__(self, embeddings, dim: int, max_entries: int, ttl: float, threshold: float, replay_chunk_size: int):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.replay_chunk_size = replay_chunk_size
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._scopes = np.zeros(max_entries, dtype=np.int64)
+        self._expires = np.zeros(max_entries, dtype=np.float64)   # 0 marks a free slot
+        self._slot_keys: List[Optional[str]] = [None] * max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+
+    @staticmethod
+    def _scope_id(scope: str) -> int:
+        return int(scope[:15], 16)
+
+    async def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _keys(self, model_name: str, system_prompt: str, normalized: List[Tuple[str, str]]) -> Tuple[str, int]:
+        exact_key = _digest(model_name, normalize_text(system_prompt), normalized)
+        scope = _digest(model_name, normalize_text(system_prompt), normalized[:-1])
+        return exact_key, self._scope_id(scope)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._expires[entry.slot] = 0
+        self._slot_keys[entry.slot] = None
+        self._free.append(entry.slot)
+
+    async def lookup(self, model_name: str, system_prompt: str, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Return a cached answer for this conversation, if any."""
+        normalized = normalize_messages(messages)
+        if not normalized or normalized[-1][0] != "user":
+            return None
+
+        exact_key, scope_id = self._keys(model_name, system_prompt, normalized)
+        now = time.time()
+        entry = self._entries.get(exact_key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(exact_key)
+                metrics.incr("response_cache_hits_total", model=model_name, tier="exact")
+                return entry.answer
+            self._remove(exact_key)
+
+        if self.threshold < 1:
+            query = await self._embed(normalized[-1][1])
+            mask = (self._expires > now) & (self._scopes == scope_id)
+            if mask.any():
+                candidates = np.flatnonzero(mask)
+                scores = self._vectors[candidates] @ query
+                best = int(np.argmax(scores))
+                key = self._slot_keys[int(candidates[best])]
+                if scores[best] >= self.threshold and key in self._entries:
+                    self._entries.move_to_end(key)
+                    metrics.incr("response_cache_hits_total", model=model_name, tier="semantic")
+                    metrics.observe("response_cache_similarity", float(scores[best]))
+                    return self._entries[key].answer
+
+        metrics.incr("response_cache_misses_total", model=model_name)
+        return None
+
+    async def store(self, model_name: str, system_prompt: str, messages: List[Dict[str, Any]], answer: str):
+        """Remember the answer to this conversation."""
+        normalized = normalize_messages(messages)
+        if not answer or not normalized or normalized[-1][0] != "user":
+            return
+
+        exact_key, scope_id = self._keys(model_name, system_prompt, normalized)
+        vector = await self._embed(normalized[-1][1]) if self.threshold < 1 else 0
+        if exact_key in self._entries:
+            self._remove(exact_key)
+        if not self._free:
+            now = time.time()
+            expired = [k for k, e in self._entries.items() if e.expires_at <= now]
+            for key in expired or [next(iter(self._entries))]:
+                self._remove(key)
+            metrics.incr("response_cache_evictions_total", len(expired) or 1)
+
+        slot = self._free.pop()
+        expires_at = time.time() + self.ttl
+        self._vectors[slot] = vector
+        self._scopes[slot] = scope_id
+        self._expires[slot] = expires_at
+        self._slot_keys[slot] = exact_key
+        self._entries[exact_key] = _Entry(slot=slot, answer=answer, expires_at=expires_at)
+        metrics.set_gauge("response_cache_entries", len(self._entries))
+
+    async def replay(self, answer: str) -> AsyncGenerator[str, None]:
+        """Yield a cached answer in stream-sized chunks."""
+        for i in range(0, len(answer), self.replay_chunk_size):
+            yield answer[i:i + self.replay_chunk_size]
+            await asyncio.sleep(0)
+
+    def clear(self):
+        self._entries.clear()
+        self._expires[:] = 0
+        self._slot_keys = [None] * self.max_entries
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+def build_embeddings(kind: str, model_id: str, dim: int):
+    """"bedrock" (BedrockEmbeddings on the shared client) or the offline LocalHashingEmbeddings."""
+    if kind == "bedrock":
+        from langchain_aws import BedrockEmbeddings
+        from helpers.aws import aws_clients
+        aws_conf = AWSConfig()
+        return BedrockEmbeddings(
+            client=aws_clients.client("bedrock-runtime", aws_conf.aws_region),
+            model_id=model_id,
+        )
+    return LocalHashingEmbeddings(dim=dim)
+
+response_cache_conf = ResponseCacheConfig()
+response_cache = None
+if response_cache_conf.response_cache_enable == "enable":
+    threshold = float(response_cache_conf.response_cache_similarity_threshold)
+    if response_cache_conf.response_cache_embeddings != "bedrock" and threshold < 1:
+        # Bag-of-words hashing scores "enable 2FA" and "disable 2FA" above 0.93: only exact matches are safe
+        logger.warning("[ResponseCache] Semantic tier disabled: it needs RESPONSE_CACHE_EMBEDDINGS=bedrock.")
+        threshold = 1.0
+    response_cache = ResponseCache(
+        embeddings=build_embeddings(
+            response_cache_conf.response_cache_embeddings,
+            response_cache_conf.response_cache_embedding_model_id,
+            int(response_cache_conf.response_cache_embedding_dim),
+        ),
+        dim=int(response_cache_conf.response_cache_embedding_dim),
+        max_entries=int(response_cache_conf.response_cache_max_entries),
+        ttl=float(response_cache_conf.response_cache_ttl),
+        threshold=threshold,
+        replay_chunk_size=int(response_cache_conf.response_cache_replay_chunk_size),
+    )
+    logger.info(f"[ResponseCache] Enabled with {response_cache_conf.response_cache_embeddings} embeddings.")
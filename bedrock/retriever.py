@@ -1,20 +1,169 @@
-import boto3
+import json
+import time
 import asyncio
-from helpers.config import AppConfig, AWSConfig
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 from langchain_aws.retrievers import AmazonKnowledgeBasesRetriever
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import AWSConfig, DatabaseConfig, KnowledgeBaseConfig
+from helpers.aws import aws_clients
+from databases.crud import get_agents
+from databases.database import SessionLocal
+from tools.cache import tool_result_cache
+from tools.executor import tool_executor
+
+TOOL_NAME = "knowledge_base"
+
+@dataclass(frozen=True)
+class Passage(object):
+    """One retrieved chunk of a knowledge base."""
+
+    kb_id: str
+    text: str
+    score: float
+    source: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict, hash=False, compare=False)
+
+    @property
+    def key(self) -> str:
+        """Identity for deduplication: the same chunk can be indexed by several knowledge bases."""
+        return hashlib.sha256(f"{self.source or ''}\n{self.text.strip()}".encode("utf-8")).hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kb_id": self.kb_id, "text": self.text, "score": self.score, "source": self.source, "metadata": self.metadata}
+
+def parse_kb_ids(value: Optional[str]) -> List[str]:
+    ids = []
+    for kb_id in (value or "").split(","):
+        kb_id = kb_id.strip()
+        if kb_id and kb_id not in ids:
+            ids.append(kb_id)
+    return ids
+
+def _source(metadata: Dict[str, Any]) -> Optional[str]:
+    location = metadata.get("location") or {}
+    for value in location.values():
+        if isinstance(value, dict):
+            for key in ("uri", "url"):
+                if value.get(key):
+                    return value[key]
+    return metadata.get("source")
 
 class RetrieverKB(object):
-    def __init__(self):
+    """
+    Retrieval over Bedrock knowledge bases.
+    Keeps one retriever per knowledge base on the shared bedrock-agent-runtime
+    client, caches results per (kb_id, normalized query) through the tool
+    result cache, and fans a query out to every knowledge base listed on the
+    `agents` rows, merging the answers by score.
+    """
+
+    def __init__(self, results_per_kb: int, top_k: int, min_score: float, kb_ids_ttl: float, persist: bool):
         self.aws_conf = AWSConfig()
-        self.bedrock_agent_runtime = boto3.client("bedrock-agent-runtime", region_name=self.aws_conf.aws_region)
-
-    async def general_knowledge_base(self, query: str) -> list[str]:
-        def retrieve():
-            retriever = AmazonKnowledgeBasesRetriever(
-                client=self.bedrock_agent_runtime,
-                knowledge_base_id=self.aws_conf.bedrock_knowledge_base_id,
-                retrieval_config={"vectoerSearchConfiguration": {"numberOfResults": 5}},
+        self.results_per_kb = results_per_kb
+        self.top_k = top_k
+        self.min_score = min_score
+        self.kb_ids_ttl = kb_ids_ttl
+        self.persist = persist
+        self._retrievers: Dict[str, AmazonKnowledgeBasesRetriever] = {}
+        self._kb_ids: Optional[Tuple[List[str], float]] = None
+
+    def retriever(self, kb_id: str) -> AmazonKnowledgeBasesRetriever:
+        retriever = self._retrievers.get(kb_id)
+        if retriever is None:
+            retriever = self._retrievers[kb_id] = AmazonKnowledgeBasesRetriever(
+                client=aws_clients.client("bedrock-agent-runtime", self.aws_conf.aws_region),
+                knowledge_base_id=kb_id,
+                retrieval_config={"vectorSearchConfiguration": {"numberOfResults": self.results_per_kb}},
             )
-            contexts = retriever.invoke(input=query)
-            return contexts
-        return await asyncio.to_thread(retrieve)
\ No newline at end of file
+        return retriever
+
+    async def kb_ids(self) -> List[str]:
+        """Knowledge bases of the `agents` rows (comma-separated ids), else BEDROCK_KNOWLEDGE_BASE_ID."""
+        if self._kb_ids and self._kb_ids[1] > time.monotonic():
+            return self._kb_ids[0]
+
+        ids: List[str] = []
+        if self.persist:
+            try:
+                async with SessionLocal() as session:
+                    agents = await get_agents(session)
+                for agent in agents:
+                    ids += [kb_id for kb_id in parse_kb_ids(agent.knowledge_base_id) if kb_id not in ids]
+            except Exception as e:
+                logger.error(f"[KB] Failed to load knowledge base ids: {e}")
+        ids = ids or parse_kb_ids(self.aws_conf.bedrock_knowledge_base_id)
+        self._kb_ids = (ids, time.monotonic() + self.kb_ids_ttl)
+        return ids
+
+    def invalidate(self):
+        """Forget the knowledge base ids, e.g. after an `agents` row changed."""
+        self._kb_ids = None
+
+    async def _retrieve(self, kb_id: str, query: str) -> List[Passage]:
+        def retrieve() -> str:
+            documents = self.retriever(kb_id).invoke(input=query)
+            return json.dumps([
+                {"text": d.page_content, "score": float(d.metadata.get("score") or 0.0), "source": _source(d.metadata), "metadata": d.metadata}
+                for d in documents
+            ], default=str)
+
+        name = f"{TOOL_NAME}:{kb_id}"
+        raw = await tool_result_cache.get_or_fetch(name, query, lambda: tool_executor.run(name, retrieve))
+        return [Passage(kb_id=kb_id, **item) for item in json.loads(raw)]
+
+    async def search(self, query: str, kb_ids: Optional[List[str]] = None) -> List[Passage]:
+        """Query the knowledge bases concurrently; return the top passages, deduplicated and ranked by score."""
+        kb_ids = kb_ids if kb_ids is not None else await self.kb_ids()
+        if not kb_ids:
+            return []
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._retrieve(kb_id, query) for kb_id in kb_ids), return_exceptions=True)
+
+        best: Dict[str, Passage] = {}
+        for kb_id, result in zip(kb_ids, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                metrics.incr("kb_errors_total", kb=kb_id)
+                logger.error(f"[KB] Retrieval from {kb_id} failed: {result}")
+                continue
+            for passage in result:
+                if passage.score < self.min_score:
+                    continue
+                current = best.get(passage.key)
+                if current is None or passage.score > current.score:
+                    best[passage.key] = passage
+
+        ranked = sorted(best.values(), key=lambda p: p.score, reverse=True)[:self.top_k]
+        metrics.observe("kb_search_ms", (time.perf_counter() - started) * 1000, kbs=len(kb_ids))
+        return ranked
+
+def build_retriever(conf: KnowledgeBaseConfig, persist: bool) -> RetrieverKB:
+    kwargs = dict(
+        results_per_kb=int(conf.kb_results_per_kb),
+        top_k=int(conf.kb_top_k),
+        min_score=float(conf.kb_min_score),
+        kb_ids_ttl=float(conf.kb_ids_cache_ttl),
+        persist=persist,
+    )
+    if conf.kb_backend == "local":
+        from bedrock.local_kb import LocalRetrieverKB
+        from bedrock.response_cache import build_embeddings
+        dim = int(conf.kb_local_embedding_dim)
+        return LocalRetrieverKB(
+            root=conf.kb_local_path,
+            embeddings=build_embeddings(conf.kb_local_embeddings, conf.kb_local_embedding_model_id, dim),
+            dim=dim,
+            nprobe=int(conf.kb_local_ivf_nprobe),
+            ivf_min_rows=int(conf.kb_local_ivf_min_rows),
+            **kwargs,
+        )
+    return RetrieverKB(**kwargs)
+
+db_conf = DatabaseConfig()
+kb_conf = KnowledgeBaseConfig()
+kb_retriever = build_retriever(kb_conf, persist=db_conf.db_enable == "enable")
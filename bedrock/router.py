@@ -0,0 +1,270 @@
+import time
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from langchain.agents.middleware import AgentMiddleware
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import AWSConfig, RoutingConfig
+from helpers.aws import aws_clients, async_aws_clients
+from bedrock.cancel import StreamTrackingClient
+from bedrock.fake import FakeBedrockRuntime, AsyncFakeBedrockRuntime
+from bedrock.throttle import BedrockGovernor, BedrockThrottled, bedrock_governor, estimate_tokens, is_retryable, is_throttling, message_texts
+
+def parse_regions(value: Optional[str]) -> Tuple[str, ...]:
+    """"us-east-1, us-west-2" -> ("us-east-1", "us-west-2"), in preference order."""
+    regions = []
+    for region in (value or "").split(","):
+        region = region.strip()
+        if region and region not in regions:
+            regions.append(region)
+    return tuple(regions)
+
+class TimedEventStream(object):
+    """Wraps a Converse event stream and reports time to the first content delta."""
+
+    def __init__(self, stream, on_first_token: Callable[[float], None], started: float):
+        self._stream = stream
+        self._on_first_token = on_first_token
+        self._started = started
+
+    def __iter__(self):
+        first = True
+        for event in self._stream:
+            if first and "contentBlockDelta" in event:
+                first = False
+                self._on_first_token((time.perf_counter() - self._started) * 1000)
+            yield event
+
+    def close(self):
+        self._stream.close()
+
+class TimedClient(object):
+    """bedrock-runtime client proxy that feeds per-region latency to the router."""
+
+    def __init__(self, client, region: str, router: "RegionRouter"):
+        self._client = client
+        self._region = region
+        self._router = router
+
+    def converse_stream(self, **kwargs):
+        started = time.perf_counter()
+        response = self._client.converse_stream(**kwargs)
+        model_id = kwargs.get("modelId", "unknown")
+        response["stream"] = TimedEventStream(
+            response["stream"],
+            lambda ms: self._router.record_latency(model_id, self._region, ms),
+            started,
+        )
+        return response
+
+    def converse(self, **kwargs):
+        # Without streaming the first token arrives with the whole answer
+        started = time.perf_counter()
+        response = self._client.converse(**kwargs)
+        self._router.record_latency(kwargs.get("modelId", "unknown"), self._region, (time.perf_counter() - started) * 1000)
+        return response
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+@dataclass
+class RegionHealth(object):
+    ttft_ms: Optional[float] = None     # EWMA of time to first token
+    error_rate: float = 0.0             # EWMA of failed calls (0 or 1 per call)
+    cooldown_until: float = 0.0
+
+class RegionRouter(object):
+    """
+    Keeps a bedrock-runtime client per region and sends each call to the
+    healthiest region of the model: lowest recent time to first token, scaled
+    up by the recent error/throttle rate. Regions that just failed sit out a
+    cooldown. A call that fails before streaming starts moves to the next region.
+    """
+
+    def __init__(self, aws_conf: AWSConfig, governor: BedrockGovernor, default_regions: Tuple[str, ...],
+                 alpha: float, error_penalty: float, cooldown: float):
+        self.aws_conf = aws_conf
+        self.governor = governor
+        self.default_regions = default_regions
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.cooldown = cooldown
+        self._clients: Dict[str, Any] = {}
+        self._fakes: Dict[str, FakeBedrockRuntime] = {}
+        self._health: Dict[Tuple[str, str], RegionHealth] = {}
+        # Latency is reported from the executor threads that read the event streams
+        self._lock = threading.Lock()
+
+    def client(self, region: str):
+        client = self._clients.get(region)
+        if client is None:
+            if self.aws_conf.bedrock_backend == "fake":
+                raw = self._fakes[region] = FakeBedrockRuntime(region_name=region)
+            else:
+                # Retries are handled by bedrock.throttle, which knows whether streaming has started
+                raw = aws_clients.client("bedrock-runtime", region, max_attempts=1)
+            # Tracked so a client disconnect can close the Bedrock event stream right away
+            client = self._clients[region] = StreamTrackingClient(TimedClient(raw, region, self))
+        return client
+
+    async def async_client(self, region: str):
+        """aiobotocore bedrock-runtime client of a region, for BEDROCK_CLIENT=async."""
+        if self.aws_conf.bedrock_backend == "fake":
+            self.client(region)
+            return AsyncFakeBedrockRuntime(self._fakes[region])
+        return await async_aws_clients.client("bedrock-runtime", region, max_attempts=1)
+
+    def regions(self, configured: Optional[Sequence[str]]) -> Tuple[str, ...]:
+        return tuple(configured) if configured else self.default_regions
+
+    def _get_health(self, model_id: str, region: str) -> RegionHealth:
+        key = (model_id, region)
+        health = self._health.get(key)
+        if health is None:
+            health = self._health[key] = RegionHealth()
+        return health
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else (1 - self.alpha) * current + self.alpha * value
+
+    def record_latency(self, model_id: str, region: str, ttft_ms: float):
+        with self._lock:
+            health = self._get_health(model_id, region)
+            health.ttft_ms = self._ewma(health.ttft_ms, ttft_ms)
+        metrics.observe("bedrock_region_ttft_ms", ttft_ms, model=model_id, region=region)
+
+    def record_success(self, model_id: str, region: str):
+        with self._lock:
+            health = self._get_health(model_id, region)
+            health.error_rate = self._ewma(health.error_rate, 0.0)
+
+    def record_failure(self, model_id: str, region: str, reason: str):
+        with self._lock:
+            health = self._get_health(model_id, region)
+            health.error_rate = self._ewma(health.error_rate, 1.0)
+            health.cooldown_until = time.monotonic() + self.cooldown
+        metrics.incr("bedrock_region_errors_total", model=model_id, region=region, reason=reason)
+
+    def rank(self, model_id: str, regions: Sequence[str]) -> List[str]:
+        """Regions ordered best first; unmeasured regions score like the best measured one so they get tried."""
+        now = time.monotonic()
+        with self._lock:
+            health = {r: self._get_health(model_id, r) for r in regions}
+        measured = [h.ttft_ms for h in health.values() if h.ttft_ms is not None]
+        baseline = min(measured) if measured else 0.0
+
+        def score(region: str) -> Tuple[bool, float, int]:
+            h = health[region]
+            ttft = h.ttft_ms if h.ttft_ms is not None else baseline
+            return (h.cooldown_until > now, ttft * (1 + self.error_penalty * h.error_rate), regions.index(region))
+
+        ranked = sorted(regions, key=score)
+        for region in ranked:
+            metrics.set_gauge("bedrock_region_score", round(score(region)[1], 2), model=model_id, region=region)
+        return ranked
+
+    @staticmethod
+    def _reason(exc: BaseException) -> str:
+        if isinstance(exc, BedrockThrottled):
+            return "rate_limited"
+        return "throttled" if is_throttling(exc) else "error"
+
+    def _can_fail_over(self, exc: BaseException) -> bool:
+        return isinstance(exc, BedrockThrottled) or is_retryable(exc)
+
+    def _failover(self, model_id: str, region: str, ranked: List[str], exc: BaseException):
+        next_region = ranked[ranked.index(region) + 1]
+        metrics.incr("bedrock_region_failover_total", model=model_id, source=region, target=next_region)
+        logger.warning(f"[Router] {model_id} failed in {region} ({exc}), failing over to {next_region}.")
+
+    async def call(self, model_id: str, regions: Sequence[str], estimated_tokens: int,
+                   invoke: Callable[[str], Any]) -> Tuple[str, Any]:
+        """Run a non-streaming call (await invoke(region)) in the best region; returns (region, result)."""
+        ranked = self.rank(model_id, regions)
+        for i, region in enumerate(ranked):
+            last = i == len(ranked) - 1
+            try:
+                result = await self.governor.call(model_id, region, estimated_tokens, lambda: invoke(region),
+                                                  max_attempts=None if last else 1)
+            except Exception as e:
+                if self._can_fail_over(e):
+                    self.record_failure(model_id, region, self._reason(e))
+                if last or not self._can_fail_over(e):
+                    raise
+                self._failover(model_id, region, ranked, e)
+                continue
+            self.record_success(model_id, region)
+            return region, result
+
+    async def stream(self, model_id: str, regions: Sequence[str], estimated_tokens: int,
+                     open_stream: Callable[[str], AsyncIterator[Any]]) -> AsyncGenerator[Any, None]:
+        """
+        Relay a streaming call from the best region. Regions are tried once each,
+        and only the last one retries with backoff; after the first chunk there is no failover.
+        """
+        ranked = self.rank(model_id, regions)
+        for i, region in enumerate(ranked):
+            last = i == len(ranked) - 1
+            stream = self.governor.stream(model_id, region, estimated_tokens, lambda: open_stream(region),
+                                          max_attempts=None if last else 1)
+            started = False
+            try:
+                async for chunk in stream:
+                    if not started:
+                        started = True
+                        self.record_success(model_id, region)
+                    yield chunk
+                return
+            except Exception as e:
+                if started or self._can_fail_over(e):
+                    self.record_failure(model_id, region, self._reason(e))
+                if started or last or not self._can_fail_over(e):
+                    raise
+                self._failover(model_id, region, ranked, e)
+            finally:
+                await stream.aclose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"model_id": m, "region": r, "ttft_ms": h.ttft_ms, "error_rate": round(h.error_rate, 3),
+                 "cooling_down": h.cooldown_until > time.monotonic()}
+                for (m, r), h in self._health.items()
+            ]
+
+class RegionRoutingMiddleware(AgentMiddleware):
+    """Runs every model call of the agent loop in the best region, under the Bedrock rate governor."""
+
+    def __init__(self, router: RegionRouter, models: Dict[str, Any]):
+        super().__init__()
+        self.router = router
+        self.models = models
+
+    async def awrap_model_call(self, request, handler):
+        model_id = getattr(request.model, "model_id", "unknown")
+        messages = list(request.messages)
+        if request.system_message is not None:
+            messages.append(request.system_message)
+        estimated = estimate_tokens(message_texts(messages)) + int(getattr(request.model, "max_tokens", 0) or 0)
+
+        region, response = await self.router.call(
+            model_id, list(self.models), estimated,
+            lambda region: handler(request.override(model=self.models[region])),
+        )
+        usage = None
+        for message in getattr(response, "result", []) or []:
+            usage = getattr(message, "usage_metadata", None) or usage
+        self.router.governor.get(model_id, region).record_usage(estimated, usage.get("total_tokens") if usage else None)
+        return response
+
+aws_conf = AWSConfig()
+routing_conf = RoutingConfig()
+region_router = RegionRouter(
+    aws_conf=aws_conf,
+    governor=bedrock_governor,
+    default_regions=parse_regions(routing_conf.bedrock_regions) or (aws_conf.aws_region,),
+    alpha=float(routing_conf.bedrock_region_ewma_alpha),
+    error_penalty=float(routing_conf.bedrock_region_error_penalty),
+    cooldown=float(routing_conf.bedrock_region_cooldown),
+)
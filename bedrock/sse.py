@@ -0,0 +1,145 @@
+import json
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Optional, Union
+
+# Event types sent to clients
+TOKEN = "token"
+TOOL_START = "tool_start"
+TOOL_END = "tool_end"
+USAGE = "usage"
+ERROR = "error"
+DONE = "done"
+
+@dataclass
+class StreamEvent(object):
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def token(cls, text: str) -> "StreamEvent":
+        return cls(TOKEN, {"text": text})
+
+    @classmethod
+    def usage(cls, usage: Dict[str, Any]) -> "StreamEvent":
+        details = usage.get("input_token_details") or {}
+        return cls(USAGE, {
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "cache_read": details.get("cache_read", 0),
+            "cache_write": details.get("cache_creation", 0),
+        })
+
+    @classmethod
+    def error(cls, message: str, code: str = "internal_error") -> "StreamEvent":
+        return cls(ERROR, {"message": message, "code": code})
+
+class Heartbeat(object):
+    """Marker emitted by `pace` when the stream has been idle for a while."""
+
+HEARTBEAT = Heartbeat()
+
+async def pace(
+    events: AsyncIterator[StreamEvent],
+    window: float,
+    max_bytes: int,
+    heartbeat_interval: Optional[float] = None,
+) -> AsyncGenerator[Union[StreamEvent, Heartbeat], None]:
+    """
+    Merge consecutive token events so that each write carries up to `window`
+    seconds or `max_bytes` of text, instead of one write per model delta.
+    Buffered text is flushed before any other event, so ordering is preserved.
+    With `heartbeat_interval`, HEARTBEAT is yielded whenever the source stays
+    quiet that long (e.g. while tools run).
+    """
+    iterator = events.__aiter__()
+    buffer, size, flush_at = [], 0, None
+    last_write = time.monotonic()
+    pending: Optional[asyncio.Future] = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            now = time.monotonic()
+            deadlines = []
+            if flush_at is not None:
+                deadlines.append(flush_at - now)
+            if heartbeat_interval:
+                deadlines.append(last_write + heartbeat_interval - now)
+            timeout = max(min(deadlines), 0) if deadlines else None
+
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                if buffer:
+                    yield StreamEvent.token("".join(buffer))
+                    buffer, size, flush_at = [], 0, None
+                elif heartbeat_interval:
+                    yield HEARTBEAT
+                last_write = time.monotonic()
+                continue
+
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if event.type == TOKEN:
+                text = event.data.get("text", "")
+                buffer.append(text)
+                size += len(text.encode("utf-8"))
+                if flush_at is None:
+                    flush_at = time.monotonic() + window
+                if size < max_bytes and window > 0:
+                    continue
+                event = StreamEvent.token("".join(buffer))
+                buffer, size, flush_at = [], 0, None
+            elif buffer:
+                yield StreamEvent.token("".join(buffer))
+                buffer, size, flush_at = [], 0, None
+
+            yield event
+            last_write = time.monotonic()
+
+        if buffer:
+            yield StreamEvent.token("".join(buffer))
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+def encode_sse(item: Union[StreamEvent, Heartbeat]) -> str:
+    """One `text/event-stream` frame."""
+    if isinstance(item, Heartbeat):
+        return ": ping\n\n"
+    return f"event: {item.type}\ndata: {json.dumps(item.data, ensure_ascii=False)}\n\n"
+
+def encode_raw(item: Union[StreamEvent, Heartbeat]) -> str:
+    """Plain-text rendering used by existing clients: answer text and inline errors only."""
+    if isinstance(item, Heartbeat):
+        return ""
+    if item.type == TOKEN:
+        return item.data.get("text", "")
+    if item.type == ERROR:
+        if item.data.get("code") == "model_not_found":
+            return item.data.get("message", "")
+        return f"\n[Error] {item.data.get('message', '')}"
+    if item.type == DONE:
+        return "\n"
+    return ""
+
+async def render_sse(events: AsyncIterator[StreamEvent], window: float, max_bytes: int, heartbeat_interval: float) -> AsyncGenerator[str, None]:
+    async for item in pace(events, window, max_bytes, heartbeat_interval):
+        yield encode_sse(item)
+
+async def render_raw(events: AsyncIterator[StreamEvent], window: float, max_bytes: int) -> AsyncGenerator[str, None]:
+    async for item in pace(events, window, max_bytes):
+        text = encode_raw(item)
+        if text:
+            yield text
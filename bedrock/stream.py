@@ -1,42 +1,102 @@
-import asyncio
+import time
 import traceback
 from helpers.loog import logger
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from helpers.metrics import metrics
+from helpers.config import StreamConfig
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 from bedrock.factory import AgentFactory, LLMFactory, PromptFactory
-from typing import AsyncGenerator
+from bedrock.context import context_manager
+from bedrock.prompt_cache import cached_system_prompt, record_usage
+from bedrock.response_cache import response_cache
+from bedrock.router import region_router
+from bedrock.throttle import estimate_tokens
+from bedrock.sse import StreamEvent, TOOL_START, TOOL_END, DONE, render_raw, render_sse
+from databases.session_store import conversation_store
+from typing import AsyncGenerator, AsyncIterator, List, Optional
 
 class Streaming():
     def __init__(self):
         self.agent_factory = AgentFactory()
         self.llm_factory = LLMFactory()
-        
-    async def agent_astreaming(self, chat_id: str, message: dict, model_name: str, stream_mode: str) -> AsyncGenerator[str, None]:
+        self.stream_conf = StreamConfig()
+
+    async def save_turns(self, chat_id: Optional[str], new_turns: Optional[List[dict]], answer: str):
+        """Hand the new user turns and the assistant answer to the conversation store."""
+        if chat_id and new_turns and answer:
+            await conversation_store.append(chat_id, new_turns + [{"role": "assistant", "content": answer}])
+
+    async def fit_context(self, message: dict, model_name: str, system_prompt: str) -> dict:
+        """Trim the conversation to the token budget of the model."""
+        budget = await context_manager.budget(model_name)
+        summarizer = await self.llm_factory.llm(model_name=model_name) if context_manager.mode == "summary" else None
+        messages = await context_manager.apply(message.get("messages", []), system_prompt, budget, model_name, llm=summarizer)
+        return {**message, "messages": messages}
+
+    def render(self, events: AsyncIterator[StreamEvent], stream_format: str) -> AsyncGenerator[str, None]:
+        """Serialize events as Server-Sent Events ("sse") or as the plain answer text ("raw")."""
+        window = float(self.stream_conf.stream_coalesce_ms) / 1000
+        max_bytes = int(self.stream_conf.stream_coalesce_bytes)
+        if stream_format == "sse":
+            return render_sse(events, window, max_bytes, float(self.stream_conf.stream_heartbeat_interval))
+        return render_raw(events, window, max_bytes)
+
+    def agent_astreaming(self, chat_id: str, message: dict, model_name: str, stream_mode: str, new_turns: Optional[List[dict]] = None) -> AsyncGenerator[str, None]:
+        return self.render(self.agent_aevents(chat_id, message, model_name, stream_mode, new_turns), "raw")
+
+    def llm_astreaming(self, chat_id: str, message: dict, model_name: str, new_turns: Optional[List[dict]] = None) -> AsyncGenerator[str, None]:
+        return self.render(self.llm_aevents(chat_id, message, model_name, new_turns), "raw")
+
+    async def agent_aevents(self, chat_id: str, message: dict, model_name: str, stream_mode: str, new_turns: Optional[List[dict]] = None) -> AsyncGenerator[StreamEvent, None]:
         try:
             agent = await self.agent_factory.agent(model_name=model_name)
             if agent:
-                # The ReAct agent returns a dict with 'output'
+                model = await self.llm_factory.model(model_name=model_name)
+                message = await self.fit_context(message, model_name, self.agent_factory.agent_prompt(model))
+                answer_parts = []
+                started = time.perf_counter()
+                first_token_ms = None
                 async for token, metadata in agent.astream(input=message, stream_mode=stream_mode):
-                    if metadata.get("langgraph_node") == "model":
+                    node = metadata.get("langgraph_node")
+                    if node == "model":
+                        if first_token_ms is None:
+                            first_token_ms = (time.perf_counter() - started) * 1000
+                        for call in getattr(token, "tool_call_chunks", None) or []:
+                            # Only the first chunk of each tool call carries its name
+                            if call.get("name"):
+                                yield StreamEvent(TOOL_START, {"id": call.get("id"), "name": call["name"]})
+                        # Each model call of the agent loop reports its usage on its last chunk
+                        if getattr(token, "usage_metadata", None):
+                            record_usage(model_name, token.usage_metadata, first_token_ms)
+                            yield StreamEvent.usage(token.usage_metadata)
+                            first_token_ms = None
+                            started = time.perf_counter()
                         content_blocks = token.content_blocks or []
                         for block in content_blocks:
                             if block.get("type") == "text":
                                 text = block.get("text", "")
                                 if text.strip():
-                                    yield text
-                                    await asyncio.sleep(0)
-                yield "\n"
+                                    answer_parts.append(text)
+                                    yield StreamEvent.token(text)
+                    elif node == "tools" and isinstance(token, ToolMessage):
+                        yield StreamEvent(TOOL_END, {"id": token.tool_call_id, "name": token.name, "status": token.status})
+                await self.save_turns(chat_id, new_turns, "".join(answer_parts))
             else:
-                yield f"Model {model_name} not found."
+                yield StreamEvent.error(f"Model {model_name} not found.", code="model_not_found")
         except Exception as e:
-            yield f"\n[Error] {str(e)}"
-            logger.error(f"An error occurred: {e} \n TRACEBACK: ", traceback.format_exc())
-    
-    async def llm_astreaming(self, chat_id: str, message: dict, model_name: str) -> AsyncGenerator[str, None]:
+            metrics.incr("stream_errors_total", endpoint="agent")
+            yield StreamEvent.error(str(e))
+            logger.error(f"[Stream] Agent stream failed: {e} \n TRACEBACK: {traceback.format_exc()}")
+        yield StreamEvent(DONE)
+
+    async def llm_aevents(self, chat_id: str, message: dict, model_name: str, new_turns: Optional[List[dict]] = None) -> AsyncGenerator[StreamEvent, None]:
         try:
-            llm = self.llm_factory.llm(model_name=model_name)
-            if llm:
-                    LLM_PROMPT = PromptFactory.load_llm_prompt()
-                    lc_messages = [SystemMessage(content=LLM_PROMPT)]
+            model = await self.llm_factory.model(model_name=model_name)
+            if model:
+                    llm = model.llm()
+                    LLM_PROMPT = model.spec.system_prompt or PromptFactory.load_llm_prompt()
+                    prompt_cache = self.agent_factory.prompt_cache_enabled(model)
+                    lc_messages = [cached_system_prompt(LLM_PROMPT, prompt_cache)]
+                    message = await self.fit_context(message, model_name, LLM_PROMPT)
 
                     for msg in message.get("messages", []):
                         role = msg["role"]
@@ -50,15 +110,52 @@ class Streaming():
                         elif role == "system":
                             lc_messages.append(SystemMessage(content=text))
 
-                    async for chunk in llm.astream(input=lc_messages):
-                        yield chunk.text
-                        await asyncio.sleep(0)
-                                        
-                    yield "\n"
+                    # Only deterministic completions are cached; sampled answers are meant to vary
+                    cacheable = response_cache is not None and model.spec.temperature <= 0
+                    cached = None
+                    if cacheable:
+                        # Embedding the prompt may call Bedrock; an outage is a cache miss, not a failed completion
+                        try:
+                            cached = await response_cache.lookup(model_name, LLM_PROMPT, message["messages"])
+                        except Exception as e:
+                            logger.error(f"[Stream] Response cache lookup failed: {e}")
+                            cached = None
+
+                    answer_parts = []
+                    if cached is not None:
+                        async for text in response_cache.replay(cached):
+                            answer_parts.append(text)
+                            yield StreamEvent.token(text)
+                    else:
+                        started = time.perf_counter()
+                        first_token_ms = None
+                        estimated = estimate_tokens(m.text for m in lc_messages) + int(llm.max_tokens or 0)
+                        chunks = region_router.stream(
+                            llm.model_id, model.regions, estimated,
+                            lambda region: model.llm(region).astream(input=lc_messages),
+                        )
+                        async for chunk in chunks:
+                            if first_token_ms is None:
+                                first_token_ms = (time.perf_counter() - started) * 1000
+                            if chunk.usage_metadata:
+                                record_usage(model_name, chunk.usage_metadata, first_token_ms)
+                                yield StreamEvent.usage(chunk.usage_metadata)
+                            if chunk.text:
+                                answer_parts.append(chunk.text)
+                                yield StreamEvent.token(chunk.text)
+
+                    answer = "".join(answer_parts)
+                    if cacheable and cached is None:
+                        # The answer is already delivered; a cache failure must not turn it into an error
+                        try:
+                            await response_cache.store(model_name, LLM_PROMPT, message["messages"], answer)
+                        except Exception as e:
+                            logger.error(f"[Stream] Failed to cache response: {e}")
+                    await self.save_turns(chat_id, new_turns, answer)
             else:
-                yield f"Model {model_name} not found."
+                yield StreamEvent.error(f"Model {model_name} not found.", code="model_not_found")
         except Exception as e:
-            yield f"\n[Error] {str(e)}"
-            logger.error(f"An error occurred: {e} \n TRACEBACK: ", traceback.format_exc())
-    
-    
\ No newline at end of file
+            metrics.incr("stream_errors_total", endpoint="llm")
+            yield StreamEvent.error(str(e))
+            logger.error(f"[Stream] LLM stream failed: {e} \n TRACEBACK: {traceback.format_exc()}")
+        yield StreamEvent(DONE)
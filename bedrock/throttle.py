@@ -0,0 +1,246 @@
+import json
+import time
+import random
+import asyncio
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+from botocore.exceptions import ClientError, EventStreamError, ConnectionError as BotoConnectionError
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import ThrottleConfig
+
+THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+TRANSIENT_CODES = {"ServiceUnavailableException", "InternalServerException", "ModelNotReadyException", "ModelTimeoutException"}
+
+class BedrockThrottled(Exception):
+    """Raised when the local rate limit for a model cannot admit a call within the allowed wait."""
+
+def error_code(exc: BaseException) -> Optional[str]:
+    if isinstance(exc, ClientError):
+        return exc.response.get("Error", {}).get("Code")
+    return None
+
+def is_throttling(exc: BaseException) -> bool:
+    return error_code(exc) in THROTTLING_CODES
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Errors raised by the converse/converse_stream call itself, before any event
+    was streamed. Errors inside the event stream (EventStreamError) are never
+    retried because part of the answer may already have been sent.
+    """
+    if isinstance(exc, EventStreamError):
+        return False
+    if isinstance(exc, BotoConnectionError):
+        return True
+    return error_code(exc) in THROTTLING_CODES | TRANSIENT_CODES
+
+def estimate_tokens(texts: Iterable[str]) -> int:
+    return max(1, sum(len(t or "") for t in texts) // 4)
+
+class TokenBucket(object):
+    """Classic token bucket; `reserve` lets callers queue by going into debt."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def reserve(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge (negative) tokens after the real usage is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class ModelGovernor(object):
+    """
+    Request (RPM) and token (TPM) buckets for one (model_id, region).
+    The effective rate backs off multiplicatively on throttling responses and
+    recovers additively on successes (AIMD), never exceeding the quota.
+    """
+
+    MIN_FACTOR = 0.1
+
+    def __init__(self, model_id: str, region: str, rpm: float, tpm: float, max_wait: float):
+        self.model_id = model_id
+        self.region = region
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self.factor = 1.0
+        self.requests = TokenBucket(rpm / 60, rpm)
+        self.tokens = TokenBucket(tpm / 60, tpm)
+        self._lock = asyncio.Lock()
+        self._publish()
+
+    def _publish(self):
+        metrics.set_gauge("bedrock_rate_rpm", round(self.rpm * self.factor, 2), model=self.model_id, region=self.region)
+        metrics.set_gauge("bedrock_rate_tpm", round(self.tpm * self.factor, 2), model=self.model_id, region=self.region)
+
+    def _set_factor(self, factor: float):
+        self.factor = min(1.0, max(self.MIN_FACTOR, factor))
+        self.requests.rate = self.rpm * self.factor / 60
+        self.tokens.rate = self.tpm * self.factor / 60
+        self._publish()
+
+    async def acquire(self, estimated_tokens: int):
+        """Wait for room in both buckets, or raise BedrockThrottled if that would take longer than `max_wait`."""
+        async with self._lock:
+            amount = min(estimated_tokens, self.tokens.capacity)
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(amount))
+            if wait > self.max_wait:
+                metrics.incr("bedrock_rate_rejected_total", model=self.model_id, region=self.region)
+                raise BedrockThrottled(f"Rate limit for {self.model_id} in {self.region} exceeded, retry in {wait:.1f}s")
+            self.requests.reserve(1)
+            self.tokens.reserve(amount)
+        if wait > 0:
+            metrics.observe("bedrock_rate_wait_ms", wait * 1000, model=self.model_id, region=self.region)
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        if actual_tokens is not None:
+            self.tokens.adjust(min(estimated_tokens, self.tokens.capacity) - actual_tokens)
+
+    def record_success(self):
+        if self.factor < 1.0:
+            self._set_factor(self.factor + 0.05)
+
+    def record_throttle(self):
+        self._set_factor(self.factor * 0.5)
+        metrics.incr("bedrock_throttled_total", model=self.model_id, region=self.region)
+        logger.warning(f"[Throttle] {self.model_id} in {self.region} throttled, rate factor now {self.factor:.2f}.")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model_id": self.model_id, "region": self.region, "rpm": self.rpm * self.factor, "tpm": self.tpm * self.factor, "factor": self.factor}
+
+class BedrockGovernor(object):
+    """Registry of ModelGovernors keyed by (model_id, region), sized from configured quotas."""
+
+    def __init__(self, default_rpm: float, default_tpm: float, quotas: Dict[str, Dict[str, float]], max_wait: float,
+                 max_attempts: int, backoff_base: float, backoff_cap: float):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.quotas = quotas
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._models: Dict[Tuple[str, str], ModelGovernor] = {}
+
+    def get(self, model_id: str, region: str) -> ModelGovernor:
+        key = (model_id, region)
+        governor = self._models.get(key)
+        if governor is None:
+            quota = self.quotas.get(model_id, {})
+            governor = self._models[key] = ModelGovernor(
+                model_id, region,
+                rpm=float(quota.get("rpm", self.default_rpm)),
+                tpm=float(quota.get("tpm", self.default_tpm)),
+                max_wait=self.max_wait,
+            )
+        return governor
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    async def call(self, model_id: str, region: str, estimated_tokens: int, invoke: Callable[[], Any], max_attempts: Optional[int] = None):
+        """Run a non-streaming model call (await invoke()) under the rate limit, retrying retryable errors."""
+        governor = self.get(model_id, region)
+        max_attempts = max_attempts or self.max_attempts
+        for attempt in range(max_attempts):
+            await governor.acquire(estimated_tokens)
+            try:
+                result = await invoke()
+            except Exception as e:
+                if is_throttling(e):
+                    governor.record_throttle()
+                if not is_retryable(e) or attempt == max_attempts - 1:
+                    raise
+                metrics.incr("bedrock_retries_total", model=model_id, region=region, code=error_code(e) or type(e).__name__)
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            governor.record_success()
+            return result
+
+    async def stream(self, model_id: str, region: str, estimated_tokens: int, open_stream: Callable[[], AsyncIterator[Any]],
+                     max_attempts: Optional[int] = None) -> AsyncGenerator[Any, None]:
+        """Relay a streaming call under the rate limit, retrying only until the first chunk has arrived."""
+        governor = self.get(model_id, region)
+        max_attempts = max_attempts or self.max_attempts
+        for attempt in range(max_attempts):
+            await governor.acquire(estimated_tokens)
+            stream = open_stream()
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                governor.record_success()
+                return
+            except Exception as e:
+                if is_throttling(e):
+                    governor.record_throttle()
+                if not is_retryable(e) or attempt == max_attempts - 1:
+                    raise
+                metrics.incr("bedrock_retries_total", model=model_id, region=region, code=error_code(e) or type(e).__name__)
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+
+            governor.record_success()
+            usage = None
+            try:
+                chunk = first
+                while True:
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    yield chunk
+                    try:
+                        chunk = await stream.__anext__()
+                    except StopAsyncIteration:
+                        break
+            except Exception as e:
+                if is_throttling(e):
+                    governor.record_throttle()
+                raise
+            finally:
+                if hasattr(stream, "aclose"):
+                    await stream.aclose()
+                governor.record_usage(estimated_tokens, usage.get("total_tokens") if usage else None)
+            return
+
+    def stats(self):
+        return [g.stats() for g in self._models.values()]
+
+def message_texts(messages: Iterable[Any]) -> Iterable[str]:
+    """Text of LangChain messages, for token estimates."""
+    for message in messages:
+        content = getattr(message, "content", "")
+        if isinstance(content, str):
+            yield content
+        else:
+            for block in content or []:
+                if isinstance(block, dict):
+                    yield block.get("text", "")
+
+throttle_conf = ThrottleConfig()
+bedrock_governor = BedrockGovernor(
+    default_rpm=float(throttle_conf.bedrock_default_rpm),
+    default_tpm=float(throttle_conf.bedrock_default_tpm),
+    quotas=json.loads(throttle_conf.bedrock_quotas or "{}"),
+    max_wait=float(throttle_conf.bedrock_rate_max_wait),
+    max_attempts=int(throttle_conf.bedrock_retry_max_attempts),
+    backoff_base=float(throttle_conf.bedrock_retry_backoff_base),
+    backoff_cap=float(throttle_conf.bedrock_retry_backoff_cap),
+)
@@ -0,0 +1,163 @@
+"""
+Compare the sync (boto3 in executor threads) and async (aiobotocore) Bedrock
+streaming paths against a local fake Converse endpoint.
+
+The fake endpoint runs in a child process and speaks the real
+`application/vnd.amazon.eventstream` wire format, so both clients do the same
+HTTP and event decoding work they would against Bedrock. CPU time is measured
+in the benchmark process only.
+
+    python -m benchmarks.bedrock_stream --concurrency 16 64 256 --tokens 200 --token-delay 0.01
+"""
+import json
+import time
+import struct
+import asyncio
+import argparse
+import binascii
+import statistics
+import multiprocessing
+from typing import Any, Dict, List
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+# ------------------- Fake endpoint -------------------
+
+def _header(name: str, value: str) -> bytes:
+    name_bytes, value_bytes = name.encode("utf-8"), value.encode("utf-8")
+    return bytes([len(name_bytes)]) + name_bytes + bytes([7]) + struct.pack(">H", len(value_bytes)) + value_bytes
+
+def encode_event(event_type: str, payload: Dict[str, Any]) -> bytes:
+    """One eventstream message: prelude, prelude CRC, headers, JSON payload, message CRC."""
+    headers = _header(":event-type", event_type) + _header(":content-type", "application/json") + _header(":message-type", "event")
+    body = json.dumps(payload).encode("utf-8")
+    prelude = struct.pack(">II", 12 + len(headers) + len(body) + 4, len(headers))
+    message = prelude + struct.pack(">I", binascii.crc32(prelude)) + headers + body
+    return message + struct.pack(">I", binascii.crc32(message))
+
+def run_server(port: int, tokens: int, token_delay: float, ready):
+    from aiohttp import web
+
+    async def converse_stream(request):
+        await request.read()
+        response = web.StreamResponse(headers={"Content-Type": "application/vnd.amazon.eventstream"})
+        await response.prepare(request)
+        await response.write(encode_event("messageStart", {"role": "assistant"}))
+        for i in range(tokens):
+            if token_delay:
+                await asyncio.sleep(token_delay)
+            await response.write(encode_event("contentBlockDelta", {"delta": {"text": f" tok{i}"}, "contentBlockIndex": 0}))
+        await response.write(encode_event("contentBlockStop", {"contentBlockIndex": 0}))
+        await response.write(encode_event("messageStop", {"stopReason": "end_turn"}))
+        usage = {"inputTokens": 10, "outputTokens": tokens, "totalTokens": tokens + 10}
+        await response.write(encode_event("metadata", {"usage": usage, "metrics": {"latencyMs": 1}}))
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/model/{model_id}/converse-stream", converse_stream)
+    ready.set()
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+# ------------------- Clients -------------------
+
+def client_config(concurrency: int) -> Dict[str, Any]:
+    return dict(max_pool_connections=max(concurrency, 10), retries={"mode": "standard", "total_max_attempts": 1})
+
+def build_sync_model(endpoint: str, concurrency: int):
+    import boto3
+    from botocore.config import Config
+    from langchain_aws import ChatBedrockConverse
+    client = boto3.client("bedrock-runtime", region_name="us-east-1", endpoint_url=endpoint,
+                          aws_access_key_id="x", aws_secret_access_key="x", config=Config(**client_config(concurrency)))
+    return ChatBedrockConverse(client=client, region_name="us-east-1", model=MODEL_ID, max_tokens=1024), None
+
+async def build_async_model(endpoint: str, concurrency: int):
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+    from bedrock.aconverse import AsyncChatBedrockConverse
+    sync_model, _ = build_sync_model(endpoint, concurrency)
+    context = get_session().create_client("bedrock-runtime", region_name="us-east-1", endpoint_url=endpoint,
+                                          aws_access_key_id="x", aws_secret_access_key="x", config=AioConfig(**client_config(concurrency)))
+    client = await context.__aenter__()
+
+    async def provider():
+        return client
+
+    model = AsyncChatBedrockConverse(client=sync_model.client, region_name="us-east-1", model=MODEL_ID, max_tokens=1024,
+                                     async_client_provider=provider)
+    return model, context
+
+# ------------------- Benchmark -------------------
+
+async def one_stream(model) -> Dict[str, float]:
+    started = time.perf_counter()
+    ttft = None
+    tokens = 0
+    async for chunk in model.astream("hello"):
+        if chunk.text:
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            tokens += 1
+    return {"ttft": ttft or 0.0, "duration": time.perf_counter() - started, "tokens": tokens}
+
+async def run_level(mode: str, endpoint: str, concurrency: int, rounds: int) -> Dict[str, Any]:
+    if mode == "async":
+        model, context = await build_async_model(endpoint, concurrency)
+    else:
+        model, context = build_sync_model(endpoint, concurrency)
+
+    await one_stream(model)  # warm up connections and loaders
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    results: List[Dict[str, float]] = []
+    for _ in range(rounds):
+        results += await asyncio.gather(*(one_stream(model) for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+    if context is not None:
+        await context.__aexit__(None, None, None)
+
+    tokens = sum(r["tokens"] for r in results)
+    ttfts = sorted(r["ttft"] for r in results)
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "streams": len(results),
+        "streams_per_s": len(results) / wall,
+        "ttft_p50_ms": statistics.median(ttfts) * 1000,
+        "ttft_p95_ms": ttfts[int(len(ttfts) * 0.95) - 1] * 1000,
+        "stream_p50_ms": statistics.median(r["duration"] for r in results) * 1000,
+        "cpu_us_per_token": cpu / max(tokens, 1) * 1e6,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--tokens", type=int, default=100, help="content deltas per stream")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between deltas")
+    parser.add_argument("--rounds", type=int, default=2, help="batches of `concurrency` streams per level")
+    parser.add_argument("--port", type=int, default=18089)
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=run_server, args=(args.port, args.tokens, args.token_delay, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+    time.sleep(0.5)
+    endpoint = f"http://127.0.0.1:{args.port}"
+
+    try:
+        rows = []
+        for concurrency in args.concurrency:
+            for mode in ("sync", "async"):
+                rows.append(asyncio.run(run_level(mode, endpoint, concurrency, args.rounds)))
+    finally:
+        server.terminate()
+
+    columns = ["mode", "concurrency", "streams", "streams_per_s", "ttft_p50_ms", "ttft_p95_ms", "stream_p50_ms", "cpu_us_per_token"]
+    print(" | ".join(f"{c:>16}" for c in columns))
+    for row in rows:
+        print(" | ".join(f"{row[c]:>16.1f}" if isinstance(row[c], float) else f"{row[c]:>16}" for c in columns))
+
+if __name__ == "__main__":
+    main()
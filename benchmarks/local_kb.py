@@ -0,0 +1,71 @@
+"""
+Brute-force vs IVF search on LocalVectorIndex, on synthetic clustered unit
+vectors (Gaussian blobs around random centres, like embedding topics).
+Recall@k is measured against the exact brute-force result.
+
+    python -m benchmarks.local_kb --rows 100000 --dim 1024 --nprobe 4 8 16
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import numpy as np
+from bedrock.local_kb import LocalVectorIndex, normalize_rows
+
+def clustered(rng, rows: int, dim: int, clusters: int, spread: float) -> np.ndarray:
+    centres = normalize_rows(rng.standard_normal((clusters, dim)).astype(np.float32))
+    labels = rng.integers(0, clusters, size=rows)
+    return normalize_rows(centres[labels] + spread * rng.standard_normal((rows, dim)).astype(np.float32) / np.sqrt(dim))
+
+def timed(index: LocalVectorIndex, queries: np.ndarray, k: int, nprobe):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append({row for row, _ in index.search(query, k, nprobe=nprobe)})
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return results, statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=200, help="topics in the synthetic data")
+    parser.add_argument("--spread", type=float, default=1.0, help="noise around each topic centre")
+    parser.add_argument("--nlist", type=int, default=0, help="inverted lists (default 4*sqrt(rows))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    path = tempfile.mkdtemp(prefix="local_kb_bench_")
+    try:
+        index = LocalVectorIndex(os.path.join(path, "kb"), args.dim)
+        data = clustered(rng, args.rows + args.queries, args.dim, args.clusters, args.spread)
+        started = time.perf_counter()
+        for start in range(0, args.rows, 10000):
+            block = data[start:min(start + 10000, args.rows)]
+            index.add(block, [{"text": str(start + i)} for i in range(len(block))])
+        print(f"append: {args.rows} rows x {args.dim} in {time.perf_counter() - started:.1f}s")
+
+        nlist = args.nlist or int(4 * np.sqrt(args.rows))
+        started = time.perf_counter()
+        index.train_ivf(nlist)
+        print(f"train_ivf: {nlist} lists in {time.perf_counter() - started:.1f}s")
+
+        queries = data[args.rows:]
+        exact, p50, p95 = timed(index, queries, args.k, None)
+        print(f"{'mode':>12} | {'p50_ms':>8} | {'p95_ms':>8} | {'recall@' + str(args.k):>9}")
+        print(f"{'brute':>12} | {p50:>8.2f} | {p95:>8.2f} | {1.0:>9.3f}")
+        for nprobe in args.nprobe:
+            found, p50, p95 = timed(index, queries, args.k, nprobe)
+            recall = sum(len(f & e) for f, e in zip(found, exact)) / sum(len(e) for e in exact)
+            print(f"{'ivf/' + str(nprobe):>12} | {p50:>8.2f} | {p95:>8.2f} | {recall:>9.3f}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
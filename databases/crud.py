@@ -1,6 +1,8 @@
 # crud.py
-from typing import List, Optional
-from sqlalchemy import select
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import select, insert, text, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from databases import models, schemas
 
@@ -68,11 +70,40 @@ async def create_message(db: AsyncSession, data: schemas.MessageCreate):
     return message
 
 
-async def get_user_messages(db: AsyncSession, user_id: int):
-    result = await db.execute(
-        select(models.MessageModel).where(models.MessageModel.user_id == user_id)
+def _user_messages_query(user_id: int, descending: bool = False):
+    order = (models.MessageModel.timestamp, models.MessageModel.id)
+    if descending:
+        order = tuple(column.desc() for column in order)
+    return (
+        select(models.MessageModel)
+        .where(models.MessageModel.user_id == user_id)
+        .order_by(*order)
     )
-    return result.scalars().all()
+
+
+async def get_user_messages(db: AsyncSession, user_id: int, limit: int, after: Optional[Tuple[datetime, int]] = None, descending: bool = False):
+    """
+    Keyset-paginated messages of a user, served by the (user_id, timestamp, id) index.
+    `after` is the (timestamp, id) of the last row of the previous page.
+    Returns the page and whether more rows follow.
+    """
+    query = _user_messages_query(user_id, descending)
+    if after is not None:
+        key = tuple_(models.MessageModel.timestamp, models.MessageModel.id)
+        query = query.where(key < tuple_(*after) if descending else key > tuple_(*after))
+
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.scalars().all()
+    return rows[:limit], len(rows) > limit
+
+
+async def stream_user_messages(db: AsyncSession, user_id: int, batch_size: int) -> AsyncIterator[models.MessageModel]:
+    """Iterate over all messages of a user through a server-side cursor."""
+    result = await db.stream(
+        _user_messages_query(user_id).execution_options(yield_per=batch_size)
+    )
+    async for message in result.scalars():
+        yield message
 
 
 async def get_message(db: AsyncSession, message_id: int):
@@ -94,12 +125,48 @@ async def delete_message(db: AsyncSession, message_id: int):
     await db.commit()
     return True
 
+# -------------------  CHAT SESSIONS  -------------------
+
+async def get_session_messages(db: AsyncSession, session_id: str, limit: int):
+    """Return the most recent `limit` messages of a chat session, oldest first."""
+    result = await db.execute(
+        select(models.MessageModel)
+        .where(models.MessageModel.session_id == session_id)
+        .order_by(models.MessageModel.timestamp.desc(), models.MessageModel.id.desc())
+        .limit(limit)
+    )
+    return list(reversed(result.scalars().all()))
+
+
+async def bulk_create_messages(db: AsyncSession, rows: List[dict]):
+    """Insert many messages with one multi-row INSERT, creating their chat sessions as needed."""
+    session_ids = sorted({r["session_id"] for r in rows if r.get("session_id")})
+    if session_ids:
+        await db.execute(
+            pg_insert(models.ChatSessionModel)
+            .values([{"id": session_id} for session_id in session_ids])
+            .on_conflict_do_update(index_elements=["id"], set_={"updated_at": func.now()})
+        )
+    await db.execute(insert(models.MessageModel).values(rows))
+    await db.commit()
+
 # -------------------  TOOL CONFIG  -------------------
 
+TOOL_CHANGES_CHANNEL = "tool_changes"
+
+async def notify_tool_change(db: AsyncSession, tool_name: str):
+    """Queue a NOTIFY for tool registries; Postgres delivers it when the transaction commits."""
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": TOOL_CHANGES_CHANNEL, "payload": tool_name},
+    )
+
+
 async def create_tool(db: AsyncSession, data: schemas.ToolCreate):
     tool_data = data.model_dump()
     tool = models.ToolModel(**tool_data)
     db.add(tool)
+    await notify_tool_change(db, tool.name)
     await db.commit()
     await db.refresh(tool)
     return tool
@@ -145,6 +212,7 @@ async def update_tool(db: AsyncSession, tool_id: int, data: schemas.ToolUpdate):
         setattr(tool, key, value)
 
     db.add(tool)
+    await notify_tool_change(db, tool.name)
     await db.commit()
     await db.refresh(tool)
     return tool
@@ -159,6 +227,7 @@ async def delete_tool(db: AsyncSession, tool_id: int):
         return None
 
     await db.delete(tool)
+    await notify_tool_change(db, tool.name)
     await db.commit()
     return True
 
@@ -186,6 +255,13 @@ async def get_llm(db: AsyncSession, llm_id: int):
     return result.scalars().first()
 
 
+async def get_llm_by_name(db: AsyncSession, name: str):
+    result = await db.execute(
+        select(models.LLMModel).where(func.lower(models.LLMModel.name) == name.lower())
+    )
+    return result.scalars().first()
+
+
 async def update_llm(db: AsyncSession, llm_id: int, data: schemas.LLMUpdate):
     result = await db.execute(
         select(models.LLMModel).where(models.LLMModel.id == llm_id)
@@ -4,10 +4,9 @@ from urllib.parse import urlparse
 from sqlalchemy.orm import sessionmaker
 from helpers.config import DatabaseConfig
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from helpers.secret import AWSSecretManager
+from helpers.secret import aws_secret_manager
 
 db_conf = DatabaseConfig()
-aws_secret_manager = AWSSecretManager()
 
 db_username = aws_secret_manager.get_secret(db_conf.db_username_key)
 db_pwd = aws_secret_manager.get_secret(db_conf.db_pwd_key)
@@ -21,6 +20,23 @@ async def get_db():
     async with SessionLocal() as session:
         yield session
 
+SCHEMA_UPGRADES = [
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS session_id VARCHAR(64) REFERENCES chat_sessions(id)",
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS content_blocks JSON",
+    "CREATE INDEX IF NOT EXISTS ix_messages_session_timestamp ON messages (session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_user_timestamp_id ON messages (user_id, timestamp, id)",
+    "ALTER TABLE llms ADD COLUMN IF NOT EXISTS context_max_tokens VARCHAR(16)",
+    "ALTER TABLE llms ADD COLUMN IF NOT EXISTS prompt_cache VARCHAR(16)",
+]
+
+async def upgrade_schema(conn):
+    """
+    Apply additive changes that `create_all` does not make to existing tables.
+    Every statement is idempotent, so it is safe to run on each startup.
+    """
+    for statement in SCHEMA_UPGRADES:
+        await conn.execute(text(statement))
+
 async def create_database_if_not_exists():
     """
     Connects to the default 'postgres' DB and creates the target database if missing.
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean, func
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean, Index, func
 from sqlalchemy.orm import relationship
 from databases.base import Base
 from sqlalchemy.types import JSON
@@ -17,6 +17,12 @@ class LLMModel(Base):
     model_max_tokens = Column(String(16), default="2048")
     model_temperature = Column(String(8), default="0.7")
 
+    # Input token budget for the conversation (system prompt + history)
+    context_max_tokens = Column(String(16), nullable=True)
+
+    # Bedrock prompt caching: "enable" or "disable"
+    prompt_cache = Column(String(16), nullable=True)
+
     # Guardrails
     guardrail_id = Column(String(255), nullable=True)
     guardrail_version = Column(String(64), nullable=True)
@@ -100,13 +106,32 @@ class UserModel(Base):
 
     roles = relationship("RoleModel", back_populates="users")
     messages = relationship("MessageModel", back_populates="users")
+    chat_sessions = relationship("ChatSessionModel", back_populates="users")
+
+class ChatSessionModel(Base):
+    __tablename__ = "chat_sessions"
+    id = Column(String(64), primary_key=True)  # chat_session_id sent by the client
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    users = relationship("UserModel", back_populates="chat_sessions")
+    messages = relationship("MessageModel", back_populates="chat_sessions")
 
 class MessageModel(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_session_timestamp", "session_id", "timestamp"),
+        Index("ix_messages_user_timestamp_id", "user_id", "timestamp", "id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    session_id = Column(String(64), ForeignKey("chat_sessions.id"), nullable=True)
     role = Column(String(10))  # "user" or "assistant"
     content = Column(Text)
+    content_blocks = Column(JSON, nullable=True)  # original content blocks (attachments included)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
     users = relationship("UserModel", back_populates="messages")
+    chat_sessions = relationship("ChatSessionModel", back_populates="messages")
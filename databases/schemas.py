@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import Optional, List, Any
 from datetime import datetime
 
@@ -54,6 +54,10 @@ class MessageOut(MessageBase):
 
     model_config = {"from_attributes": True}
 
+class MessagePage(BaseModel):
+    items: List[MessageOut]
+    next_cursor: Optional[str] = None
+
 # ------------------- Tool Schemas -------------------
 
 class ToolBase(BaseModel):
@@ -95,22 +99,66 @@ class ToolOut(ToolBase):
 
 class LLMBase(BaseModel):
     name: str
-    provider: str
+    region: Optional[str] = "ap-southeast-1"           # comma-separated, in preference order
     model_id: str
-    api_key: Optional[str] = None
-    base_url: Optional[str] = None
-    status: str
+    model_max_tokens: Optional[str] = "2048"
+    model_temperature: Optional[str] = "0.7"
+    context_max_tokens: Optional[str] = None
+    prompt_cache: Optional[str] = None                  # "enable" or "disable"
+    guardrail_id: Optional[str] = None
+    guardrail_version: Optional[str] = None
+    system_prompt: Optional[str] = None
 
-class LLMCreate(LLMBase):
+class LLMSettingsValidator(BaseModel):
+    """Rejects numeric settings the model registry could not parse (columns are strings)."""
+
+    @field_validator("model_max_tokens", "context_max_tokens", check_fields=False)
+    @classmethod
+    def _positive_int(cls, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return value
+        try:
+            number = int(value)
+        except ValueError:
+            raise ValueError("must be an integer")
+        if number <= 0:
+            raise ValueError("must be positive")
+        return str(number)
+
+    @field_validator("model_temperature", check_fields=False)
+    @classmethod
+    def _temperature(cls, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return value
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError("must be a number")
+        if not 0 <= number <= 1:
+            raise ValueError("must be between 0 and 1")
+        return value
+
+    @field_validator("prompt_cache", check_fields=False)
+    @classmethod
+    def _prompt_cache(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None and value not in ("enable", "disable"):
+            raise ValueError('must be "enable" or "disable"')
+        return value
+
+class LLMCreate(LLMSettingsValidator, LLMBase):
     pass
 
-class LLMUpdate(BaseModel):
+class LLMUpdate(LLMSettingsValidator):
     name: Optional[str] = None
-    provider: Optional[str] = None
+    region: Optional[str] = None
     model_id: Optional[str] = None
-    api_key: Optional[str] = None
-    base_url: Optional[str] = None
-    status: Optional[str] = None
+    model_max_tokens: Optional[str] = None
+    model_temperature: Optional[str] = None
+    context_max_tokens: Optional[str] = None
+    prompt_cache: Optional[str] = None
+    guardrail_id: Optional[str] = None
+    guardrail_version: Optional[str] = None
+    system_prompt: Optional[str] = None
 
 class LLMRead(LLMBase):
     id: int
@@ -63,6 +63,7 @@ async def seed_tool(session):
         {"name": "reddit", "status": "disable"},
         {"name": "searx", "status": "disable"},
         {"name": "openweather", "status": "disable"},
+        {"name": "knowledge_base", "status": "disable"},
     ]
 
     for t in tools:
@@ -0,0 +1,172 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import DatabaseConfig, SessionConfig
+from databases.crud import get_session_messages
+from databases.writer import message_writer
+from databases.database import SessionLocal
+from helpers.datamodel import ChatAgentMessage
+
+def flatten_text(content: Any) -> str:
+    """Plain-text view of a message content (string or list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content or []:
+        if isinstance(block, dict) and block.get("type") == "text":
+            parts.append(block.get("text", ""))
+    return "\n".join(parts)
+
+class ConversationStore(object):
+    """
+    Server-side chat history keyed by chat_session_id.
+    A bounded LRU of recent sessions sits in front of the `messages` table, so
+    clients only need to send the new turn. Messages are kept in the request
+    shape ({"role", "content"}) so they can be formatted like fresh input.
+    """
+
+    def __init__(self, max_sessions: int, max_messages: int, persist: bool):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.persist = persist
+        self._sessions: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    def _remember(self, session_id: str, messages: List[Dict[str, Any]]):
+        self._sessions[session_id] = messages[-self.max_messages:]
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._locks.pop(evicted, None)
+        metrics.set_gauge("conversation_store_sessions", len(self._sessions))
+
+    async def _load(self, session_id: str) -> List[Dict[str, Any]]:
+        if not self.persist:
+            return []
+        async with SessionLocal() as session:
+            rows = await get_session_messages(session, session_id, self.max_messages)
+        return [
+            {"role": row.role, "content": row.content_blocks if row.content_blocks is not None else row.content}
+            for row in rows
+        ]
+
+    async def history(self, session_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Return the stored history of a session, oldest first."""
+        if not session_id:
+            return []
+
+        messages = self._sessions.get(session_id)
+        if messages is not None:
+            self._sessions.move_to_end(session_id)
+            metrics.incr("conversation_store_hits_total")
+            return list(messages)
+
+        async with self._lock(session_id):
+            messages = self._sessions.get(session_id)
+            if messages is None:
+                metrics.incr("conversation_store_misses_total")
+                try:
+                    messages = await self._load(session_id)
+                except Exception as e:
+                    logger.error(f"[Session] Failed to load history for session {session_id}: {e}")
+                    return []
+                self._remember(session_id, messages)
+        return list(messages)
+
+    @staticmethod
+    def _fingerprint(message: Dict[str, Any]) -> Tuple[str, str]:
+        """(role, normalized text) of a message, so stored and resent copies compare equal
+        whatever their shape (string or blocks, dropped empty blocks, trailing newlines)."""
+        content = message.get("content")
+        parts = [flatten_text(content)]
+        if isinstance(content, list):
+            for block in content:
+                if not isinstance(block, dict):
+                    continue
+                if "document" in block:
+                    parts.append(f"[document:{(block['document'] or {}).get('name', '')}]")
+                elif block.get("type") == "image":
+                    parts.append(f"[image:{len((block.get('source') or {}).get('data') or '')}]")
+        return message.get("role", ""), " ".join(" ".join(parts).split())
+
+    @classmethod
+    def new_turns(cls, history: List[Dict[str, Any]], incoming: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Return the part of `incoming` that is not already stored.
+        Clients that still resend the conversation include a tail of the stored
+        history (which is itself capped at SESSION_MAX_MESSAGES); everything after
+        the latest position where that tail matches is new.
+        """
+        if not history or len(incoming) < 2:
+            return incoming
+        stored = [cls._fingerprint(m) for m in history]
+        received = [cls._fingerprint(m) for m in incoming]
+        # The overlap ends at `end`; at least the last incoming message is always new
+        for end in range(len(incoming) - 1, 0, -1):
+            size = min(end, len(stored))
+            if received[end - size:end] == stored[-size:]:
+                return incoming[end:]
+        return incoming
+
+    async def resolve(self, session_id: Optional[str], incoming: List[BaseModel]) -> Tuple[List[ChatAgentMessage], List[Dict[str, Any]]]:
+        """
+        Combine the stored history with the request messages.
+        Returns the full conversation to send to the model and the new turns to store once answered.
+        """
+        incoming_dicts = [m.model_dump(exclude_none=True) for m in incoming]
+        history = await self.history(session_id)
+        new_turns = self.new_turns(history, incoming_dicts)
+        conversation = [ChatAgentMessage.model_validate(m) for m in history] + [
+            ChatAgentMessage.model_validate(m) for m in new_turns
+        ]
+        return conversation, new_turns
+
+    async def append(self, session_id: Optional[str], messages: List[Dict[str, Any]]):
+        """Add finished turns to the hot tier and queue them for persistence."""
+        # Without a session there is no history to extend: a sessionless client resends
+        # the whole conversation every turn, and storing it would duplicate it each time.
+        if not messages or not session_id:
+            return
+
+        async with self._lock(session_id):
+            stored = self._sessions.get(session_id)
+            if stored is None:
+                try:
+                    stored = await self._load(session_id)
+                except Exception as e:
+                    logger.error(f"[Session] Failed to load history for session {session_id}: {e}")
+                    stored = []
+            self._remember(session_id, stored + messages)
+
+        # The writer is not started when database initialization failed; queueing would only stall
+        if self.persist and message_writer.running:
+            await message_writer.enqueue([
+                {
+                    "session_id": session_id,
+                    "role": m["role"],
+                    "content": flatten_text(m["content"]),
+                    "content_blocks": m["content"] if isinstance(m["content"], list) else None,
+                }
+                for m in messages
+            ])
+
+    def evict(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._locks.pop(session_id, None)
+
+db_conf = DatabaseConfig()
+session_conf = SessionConfig()
+conversation_store = ConversationStore(
+    max_sessions=int(session_conf.session_cache_max_sessions),
+    max_messages=int(session_conf.session_max_messages),
+    persist=db_conf.db_enable == "enable",
+)
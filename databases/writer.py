@@ -0,0 +1,137 @@
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import WriterConfig
+from databases.crud import bulk_create_messages
+from databases.database import SessionLocal
+
+_STOP = object()
+
+class MessageWriter(object):
+    """
+    Write-behind queue for chat turns.
+    Rows are buffered and flushed to `messages` as multi-row inserts when
+    `batch_size` rows are waiting or `flush_interval` seconds have passed.
+    A full queue makes producers wait up to `enqueue_timeout` seconds before
+    the rows are dropped.
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float, enqueue_timeout: float):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        return self._queue
+
+    async def enqueue(self, rows: List[Dict[str, Any]]) -> bool:
+        """Queue rows for persistence. Returns False when they had to be dropped."""
+        for i, row in enumerate(rows):
+            try:
+                await asyncio.wait_for(self.queue.put(row), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                dropped = len(rows) - i
+                metrics.incr("message_writer_dropped_total", dropped)
+                logger.error(f"[Writer] Queue full, dropped {dropped} message(s).")
+                return False
+        metrics.set_gauge("message_writer_queue_depth", self.queue.qsize())
+        return True
+
+    async def _collect(self) -> List[Dict[str, Any]]:
+        """Wait for the first row, then gather more until the batch is full or the interval elapses."""
+        batch = []
+        item = await self.queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while item is not _STOP:
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return batch
+        self._stopping = True
+        return batch
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                batch.append(item)
+        return batch
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _flush_rows(self, batch: List[Dict[str, Any]]):
+        """Insert rows one by one after a batch failed, so one bad row does not drop the others."""
+        failed = 0
+        for row in batch:
+            try:
+                async with SessionLocal() as session:
+                    await bulk_create_messages(session, [row])
+            except Exception as e:
+                failed += 1
+                logger.error(f"[Writer] Dropped message for session {row.get('session_id')}: {e}")
+        metrics.incr("message_writer_rows_total", len(batch) - failed)
+        if failed:
+            metrics.incr("message_writer_failed_total", failed)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            async with SessionLocal() as session:
+                await bulk_create_messages(session, batch)
+            metrics.incr("message_writer_rows_total", len(batch))
+        except Exception as e:
+            logger.warning(f"[Writer] Batch of {len(batch)} message(s) failed, retrying row by row: {e}")
+            await self._flush_rows(batch)
+        finally:
+            metrics.observe("message_writer_flush_ms", (time.perf_counter() - started) * 1000)
+            metrics.set_gauge("message_writer_queue_depth", self.queue.qsize())
+
+    async def _run(self):
+        while not self._stopping:
+            await self._flush(await self._collect())
+
+        # Shutdown: persist whatever producers queued before the stop marker.
+        remaining = self._drain()
+        for i in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[i:i + self.batch_size])
+        if remaining:
+            logger.info(f"[Writer] Flushed {len(remaining)} queued message(s) on shutdown.")
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued and stop the background writer."""
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+writer_conf = WriterConfig()
+message_writer = MessageWriter(
+    max_queue=int(writer_conf.message_writer_max_queue),
+    batch_size=int(writer_conf.message_writer_batch_size),
+    flush_interval=float(writer_conf.message_writer_flush_interval),
+    enqueue_timeout=float(writer_conf.message_writer_enqueue_timeout),
+)
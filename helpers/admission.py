@@ -0,0 +1,146 @@
+import math
+import time
+import asyncio
+import hashlib
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Deque, Dict, Tuple
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import AdmissionConfig
+
+class AdmissionRejected(Exception):
+    """Raised when a completion cannot get a stream slot; served as 429 with Retry-After."""
+
+    def __init__(self, msg: str, retry_after: int):
+        super().__init__(msg)
+        self.msg = msg
+        self.retry_after = retry_after
+
+class AdmissionTicket(object):
+    """A held stream slot. `release` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController", key: str):
+        self._controller = controller
+        self._key = key
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self._key, time.monotonic() - self._acquired_at)
+
+    async def guard(self, body: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+        """Relay a response body and give the slot back when it ends, fails or is cancelled."""
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            self.release()
+
+class AdmissionController(object):
+    """
+    Caps concurrent completion streams globally and per API credential.
+    Requests over a cap wait in a bounded FIFO queue for up to `queue_timeout`
+    seconds; waiters whose own credential is saturated do not block others.
+    Rejections happen before the response starts, so clients get a clean 429.
+    """
+
+    def __init__(self, max_concurrent: int, max_per_credential: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_per_credential = max_per_credential
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._per_key: Dict[str, int] = {}
+        self._waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+        self._avg_hold = 1.0  # EWMA of slot hold time, seconds
+
+    @staticmethod
+    def _key(credential: str) -> str:
+        return hashlib.sha256((credential or "").encode("utf-8")).hexdigest()[:16]
+
+    def _can_admit(self, key: str) -> bool:
+        return self._active < self.max_concurrent and self._per_key.get(key, 0) < self.max_per_credential
+
+    def _admit(self, key: str):
+        self._active += 1
+        self._per_key[key] = self._per_key.get(key, 0) + 1
+        metrics.set_gauge("admission_active", self._active)
+
+    def _wake(self):
+        """Admit queued requests, oldest first, while capacity allows."""
+        for entry in list(self._waiters):
+            if self._active >= self.max_concurrent:
+                break
+            key, waiter = entry
+            if waiter.done():
+                self._waiters.remove(entry)
+            elif self._can_admit(key):
+                self._waiters.remove(entry)
+                self._admit(key)
+                waiter.set_result(True)
+        metrics.set_gauge("admission_queue_depth", len(self._waiters))
+
+    def _release(self, key: str, held: float):
+        self._active -= 1
+        remaining = self._per_key.get(key, 1) - 1
+        if remaining > 0:
+            self._per_key[key] = remaining
+        else:
+            self._per_key.pop(key, None)
+        self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+        metrics.set_gauge("admission_active", self._active)
+        self._wake()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, from the average hold time and queue length."""
+        estimate = self._avg_hold * (len(self._waiters) + 1) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(min(estimate, 60)))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        metrics.incr("admission_rejected_total", reason=reason)
+        retry_after = self.retry_after()
+        logger.warning(f"[Admission] Rejected completion ({reason}), retry after {retry_after}s.")
+        return AdmissionRejected("Too many concurrent requests, please retry later.", retry_after)
+
+    async def acquire(self, credential: str) -> AdmissionTicket:
+        key = self._key(credential)
+        if self._can_admit(key):
+            self._admit(key)
+            metrics.observe("admission_wait_ms", 0)
+            return AdmissionTicket(self, key)
+
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (key, waiter)
+        self._waiters.append(entry)
+        metrics.set_gauge("admission_queue_depth", len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+            metrics.set_gauge("admission_queue_depth", len(self._waiters))
+            raise self._reject("timeout")
+        except asyncio.CancelledError:
+            # Admitted just as the caller went away: hand the slot to the next waiter
+            if waiter.done() and not waiter.cancelled():
+                self._release(key, self._avg_hold)
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+            raise
+        finally:
+            metrics.observe("admission_wait_ms", (time.monotonic() - started) * 1000)
+        return AdmissionTicket(self, key)
+
+admission_conf = AdmissionConfig()
+admission_controller = AdmissionController(
+    max_concurrent=int(admission_conf.admission_max_concurrent),
+    max_per_credential=int(admission_conf.admission_max_per_credential),
+    max_queue=int(admission_conf.admission_max_queue),
+    queue_timeout=float(admission_conf.admission_queue_timeout),
+)
@@ -0,0 +1,244 @@
+import os
+import time
+import base64
+import shutil
+import asyncio
+import hashlib
+import binascii
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import AttachmentConfig
+
+class AttachmentTooLarge(Exception):
+    """Raised when an attachment or a request's attachments exceed the size limits; served as 413."""
+
+    def __init__(self, msg: str):
+        super().__init__(msg)
+        self.msg = msg
+
+def decoded_size(encoded: str) -> int:
+    """Upper bound of the decoded size of a base64 string, without decoding it."""
+    return len(encoded) * 3 // 4
+
+class AttachmentStore(object):
+    """
+    Content-addressed store of decoded attachments, keyed by the SHA-256 of
+    the base64 text so a re-sent attachment costs a hash instead of a decode.
+    Recently used bytes stay in memory (LRU, bounded by size); entries pushed
+    out of memory spill to files in `spill_dir` (LRU, bounded by size) and
+    are promoted back on use. Large payloads are hashed and decoded in chunks
+    on a worker thread, so the event loop keeps serving other requests.
+    """
+
+    def __init__(self, max_file_bytes: int, max_image_bytes: int, max_request_bytes: int, memory_bytes: int, disk_bytes: int,
+                 spill_dir: Optional[str], chunk_bytes: int, inline_bytes: int):
+        self.max_file_bytes = max_file_bytes
+        self.max_image_bytes = max_image_bytes
+        self.max_request_bytes = max_request_bytes
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        # A multiple of 4 keeps every chunk aligned to whole base64 quanta
+        self.chunk_chars = max(4, chunk_bytes // 3 * 4)
+        self.inline_bytes = inline_bytes
+        self.memory_size = 0
+        self.disk_size = 0
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = not spill_dir
+
+    # ------------------- Limits -------------------
+
+    def check_limits(self, documents: Iterable[str], images: Iterable[str] = ()):
+        """
+        Reject oversized attachments before any decoding work is done. Images have
+        their own, larger limit on the upload: the image processor shrinks them
+        before they reach Bedrock.
+        """
+        total = 0
+        for kind, encoded, limit in (("document", documents, self.max_file_bytes), ("image", images, self.max_image_bytes)):
+            for data in encoded:
+                size = decoded_size(data)
+                if size > limit:
+                    metrics.incr("attachment_rejected_total", reason=kind)
+                    raise AttachmentTooLarge(f"{kind.capitalize()} of {size} bytes exceeds the {limit} byte limit")
+                total += size
+        if total > self.max_request_bytes:
+            metrics.incr("attachment_rejected_total", reason="request")
+            raise AttachmentTooLarge(f"Attachments of {total} bytes exceed the {self.max_request_bytes} byte request limit")
+
+    # ------------------- Hashing and decoding -------------------
+
+    def _hash(self, encoded: str) -> str:
+        digest = hashlib.sha256()
+        for start in range(0, len(encoded), self.chunk_chars):
+            digest.update(encoded[start:start + self.chunk_chars].encode("ascii", "ignore"))
+        return digest.hexdigest()
+
+    def _decode(self, encoded: str) -> Optional[bytes]:
+        try:
+            return b"".join(
+                base64.b64decode(encoded[start:start + self.chunk_chars], validate=True)
+                for start in range(0, len(encoded), self.chunk_chars)
+            )
+        except (binascii.Error, ValueError):
+            pass
+        # Line breaks or other stray characters break chunk alignment; decode leniently in one go
+        try:
+            return base64.b64decode(encoded)
+        except Exception:
+            return None
+
+    async def key(self, encoded: str) -> str:
+        if len(encoded) <= self.inline_bytes:
+            return self._hash(encoded)
+        return await asyncio.to_thread(self._hash, encoded)
+
+    # ------------------- Memory and disk tiers -------------------
+
+    def _spill_path(self, key: str) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="attachments_")
+        return os.path.join(self._spill_dir, key)
+
+    def _write_spill(self, key: str, data: bytes):
+        os.makedirs(os.path.dirname(self._spill_path(key)), exist_ok=True)
+        path = self._spill_path(key)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def _read_spill(self, key: str) -> bytes:
+        with open(self._spill_path(key), "rb") as f:
+            return f.read()
+
+    def _remove_spill(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is None:
+            return  # already evicted by a concurrent request
+        self.disk_size -= size
+        try:
+            os.remove(self._spill_path(key))
+        except OSError:
+            pass
+
+    async def _spill(self, key: str, data: bytes):
+        if self.disk_bytes <= 0 or len(data) > self.disk_bytes or key in self._disk:
+            return
+        try:
+            await asyncio.to_thread(self._write_spill, key, data)
+        except OSError as e:
+            logger.warning(f"[Attachments] Spill to disk failed: {e}")
+            return
+        if key in self._disk:
+            return  # a concurrent spill of the same content already accounted for it
+        self._disk[key] = len(data)
+        self.disk_size += len(data)
+        while self.disk_size > self.disk_bytes:
+            self._remove_spill(next(iter(self._disk)))
+
+    async def _put(self, key: str, data: bytes):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        if len(data) > self.memory_bytes:
+            await self._spill(key, data)
+            return
+        self._memory[key] = data
+        self.memory_size += len(data)
+        evicted = []
+        while self.memory_size > self.memory_bytes:
+            old_key, old_data = self._memory.popitem(last=False)
+            self.memory_size -= len(old_data)
+            evicted.append((old_key, old_data))
+        for old_key, old_data in evicted:
+            await self._spill(old_key, old_data)
+        metrics.set_gauge("attachment_cache_bytes", self.memory_size, tier="memory")
+        metrics.set_gauge("attachment_cache_bytes", self.disk_size, tier="disk")
+
+    async def _lookup(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            metrics.incr("attachment_cache_hits_total", tier="memory")
+            return data
+        if key in self._disk:
+            try:
+                data = await asyncio.to_thread(self._read_spill, key)
+            except OSError:
+                self._remove_spill(key)
+                return None
+            # The entry may have been evicted while the file was read; the bytes are still valid
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            metrics.incr("attachment_cache_hits_total", tier="disk")
+            await self._put(key, data)
+            return data
+        return None
+
+    # ------------------- Public API -------------------
+
+    async def decode(self, encoded: str) -> Optional[bytes]:
+        """Decoded bytes of a base64 attachment, from the cache when it was seen before; None if invalid."""
+        if not encoded:
+            return None
+        key = await self.key(encoded)
+        data = await self._lookup(key)
+        if data is not None:
+            return data
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            metrics.incr("attachment_cache_misses_total")
+            started = time.perf_counter()
+            if len(encoded) <= self.inline_bytes:
+                data = self._decode(encoded)
+            else:
+                data = await asyncio.to_thread(self._decode, encoded)
+            metrics.observe("attachment_decode_ms", (time.perf_counter() - started) * 1000)
+            if data is not None:
+                await self._put(key, data)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise; keep the loop from warning about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def decode_many(self, encoded: List[str]) -> Dict[str, Optional[bytes]]:
+        """Decode the distinct attachments of a request concurrently."""
+        unique = list(dict.fromkeys(e for e in encoded if e))
+        results = await asyncio.gather(*(self.decode(e) for e in unique))
+        return dict(zip(unique, results))
+
+    def close(self):
+        self._memory.clear()
+        self._disk.clear()
+        self.memory_size = self.disk_size = 0
+        if self._owns_spill_dir and self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+attachment_conf = AttachmentConfig()
+attachment_store = AttachmentStore(
+    max_file_bytes=int(attachment_conf.attachment_max_file_bytes),
+    max_image_bytes=int(attachment_conf.attachment_max_image_bytes),
+    max_request_bytes=int(attachment_conf.attachment_max_request_bytes),
+    memory_bytes=int(attachment_conf.attachment_cache_memory_bytes),
+    disk_bytes=int(attachment_conf.attachment_cache_disk_bytes),
+    spill_dir=attachment_conf.attachment_cache_dir or None,
+    chunk_bytes=int(attachment_conf.attachment_decode_chunk_bytes),
+    inline_bytes=int(attachment_conf.attachment_inline_decode_bytes),
+)
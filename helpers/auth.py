@@ -0,0 +1,147 @@
+import hmac
+import time
+import asyncio
+from typing import Optional
+from fastapi import Header
+from helpers.loog import logger
+from helpers.secret import AWSSecretManager, SecretSnapshot, aws_secret_manager
+from helpers.config import AppConfig, AuthConfig
+
+class CredentialError(Exception):
+    """Raised when a request carries a missing, malformed or invalid API credential."""
+
+    def __init__(self, status_code: int, msg: str):
+        super().__init__(msg)
+        self.status_code = status_code
+        self.msg = msg
+
+class APICredentialVerifier(object):
+    """
+    In-process verifier for the chat API credential.
+    - The credential is cached for `ttl` seconds and refreshed in the background.
+    - After a rotation the previous credential stays valid for `grace_period` seconds.
+    - Comparisons are constant-time.
+    """
+
+    def __init__(self, secret_manager: AWSSecretManager, secret_key: str, ttl: float, refresh_interval: float, grace_period: float):
+        self.secret_manager = secret_manager
+        self.secret_key = secret_key
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.grace_period = grace_period
+
+        self._current: Optional[bytes] = None
+        self._previous: Optional[bytes] = None
+        self._previous_expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.secret_manager.subscribe(self._on_secret_rotated)
+
+    def _on_secret_rotated(self, snapshot: SecretSnapshot):
+        self._store(snapshot.get(self.secret_key))
+
+    @staticmethod
+    def parse_authorization_header(authorization_header: Optional[str]) -> str:
+        """Extract the credential from an `Authorization: <scheme> <credential>` header."""
+        if not authorization_header:
+            raise CredentialError(401, "Missing authorization header")
+
+        parts = authorization_header.strip().split()
+        if len(parts) != 2:
+            raise CredentialError(401, "Malformed authorization header")
+        return parts[1]
+
+    def _is_stale(self) -> bool:
+        return self._current is None or (time.monotonic() - self._fetched_at) > self.ttl
+
+    def _store(self, credential: Optional[str]):
+        if not credential:
+            # Keep serving the last known credential rather than locking everyone out.
+            logger.warning("[Auth] API credential lookup returned nothing, keeping cached value.")
+            if self._current is not None:
+                self._fetched_at = time.monotonic()
+            return
+
+        new_value = credential.encode("utf-8")
+        now = time.monotonic()
+        if self._current is not None and not hmac.compare_digest(new_value, self._current):
+            self._previous = self._current
+            self._previous_expires_at = now + self.grace_period
+            logger.info("[Auth] API credential rotated, previous credential accepted during grace window.")
+
+        self._current = new_value
+        self._fetched_at = now
+
+    async def refresh(self):
+        """Fetch the credential from the secret store and update the cache."""
+        async with self._lock:
+            credential = await asyncio.to_thread(self.secret_manager.get_secret, self.secret_key)
+            self._store(credential)
+
+    async def _ensure_fresh(self):
+        if self._is_stale():
+            async with self._lock:
+                if self._is_stale():
+                    credential = await asyncio.to_thread(self.secret_manager.get_secret, self.secret_key)
+                    self._store(credential)
+
+    def _matches(self, credential: bytes) -> bool:
+        matched = False
+        if self._current is not None:
+            matched |= hmac.compare_digest(credential, self._current)
+        if self._previous is not None and time.monotonic() < self._previous_expires_at:
+            matched |= hmac.compare_digest(credential, self._previous)
+        return matched
+
+    async def verify(self, credential: str) -> bool:
+        await self._ensure_fresh()
+        return self._matches(credential.encode("utf-8"))
+
+    async def __call__(self, authorization_header: Optional[str]) -> str:
+        """Validate an `Authorization` header value and return the credential."""
+        credential = self.parse_authorization_header(authorization_header)
+        if not await self.verify(credential):
+            raise CredentialError(403, "Invalid credential")
+        return credential
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"[Auth] Background credential refresh failed: {e}")
+
+    async def start(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"[Auth] Initial credential load failed: {e}")
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+app_conf = AppConfig()
+auth_conf = AuthConfig()
+
+api_credential_verifier = APICredentialVerifier(
+    secret_manager=aws_secret_manager,
+    secret_key=app_conf.api_auth_key,
+    ttl=float(auth_conf.api_auth_cache_ttl),
+    refresh_interval=float(auth_conf.api_auth_refresh_interval),
+    grace_period=float(auth_conf.api_auth_rotation_grace),
+)
+
+async def require_api_credential(authorization: Optional[str] = Header(default=None)) -> str:
+    """FastAPI dependency guarding the chat completion endpoints."""
+    return await api_credential_verifier(authorization)
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import boto3
+from botocore.config import Config
+from typing import Any, Dict, List, Optional, Tuple
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import AWSClientConfig
+
+class AWSClients(object):
+    """
+    Process-wide registry of boto3 clients, one per (service, region, retry attempts).
+    Clients are thread-safe and share one tuned connection pool each, so TLS
+    connections are reused across requests instead of being re-established.
+    """
+
+    def __init__(self, max_pool_connections: int, connect_timeout: float, read_timeout: float,
+                 tcp_keepalive: bool, retry_mode: str, retry_max_attempts: int):
+        self.max_pool_connections = max_pool_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.tcp_keepalive = tcp_keepalive
+        self.retry_mode = retry_mode
+        self.retry_max_attempts = retry_max_attempts
+        # boto3 sessions are not thread-safe; clients are created under the lock
+        self._session = boto3.session.Session()
+        self._clients: Dict[Tuple[str, str, int], Any] = {}
+        self._lock = threading.Lock()
+
+    def config(self, max_attempts: int) -> Config:
+        return Config(
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            tcp_keepalive=self.tcp_keepalive,
+            retries={"mode": self.retry_mode, "total_max_attempts": max_attempts},
+        )
+
+    def client(self, service: str, region: str, max_attempts: Optional[int] = None):
+        """Shared client; pass `max_attempts=1` where retries are handled by the caller."""
+        attempts = max_attempts or self.retry_max_attempts
+        key = (service, region, attempts)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._session.client(service, region_name=region, config=self.config(attempts))
+                    self._clients[key] = client
+                    logger.info(f"[AWS] Created {service} client for {region} (pool {self.max_pool_connections}, attempts {attempts}).")
+        return client
+
+    @staticmethod
+    def _pool_usage(client) -> Tuple[int, int]:
+        """(connections in use, pool capacity) summed over the client's per-host pools."""
+        manager = client._endpoint.http_session._manager
+        in_use = capacity = 0
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            queue = pool.pool
+            if queue is None:
+                continue
+            in_use += queue.maxsize - queue.qsize()
+            capacity += queue.maxsize
+        return in_use, capacity
+
+    def pool_stats(self) -> List[Dict[str, Any]]:
+        stats = []
+        for (service, region, attempts), client in list(self._clients.items()):
+            try:
+                in_use, capacity = self._pool_usage(client)
+            except AttributeError:
+                continue
+            stats.append({
+                "service": service,
+                "region": region,
+                "in_use": in_use,
+                "capacity": capacity or self.max_pool_connections,
+            })
+        return stats
+
+    def publish_metrics(self):
+        """Refresh the connection pool gauges; called when metrics are read."""
+        for s in self.pool_stats():
+            metrics.set_gauge("aws_pool_in_use", s["in_use"], service=s["service"], region=s["region"])
+            metrics.set_gauge("aws_pool_utilization", round(s["in_use"] / s["capacity"], 3), service=s["service"], region=s["region"])
+
+class AsyncAWSClients(object):
+    """
+    aiobotocore counterpart of AWSClients with the same tuning, for code that
+    reads AWS responses on the event loop. aiobotocore is only imported when
+    a client is first requested.
+    """
+
+    def __init__(self, clients: AWSClients):
+        self.clients = clients
+        self._session = None
+        self._contexts: Dict[Tuple[str, str, int], Any] = {}
+        self._clients: Dict[Tuple[str, str, int], Any] = {}
+        self._lock = asyncio.Lock()
+
+    def config(self, max_attempts: int):
+        from aiobotocore.config import AioConfig
+        connector_args = {"keepalive_timeout": 60} if self.clients.tcp_keepalive else {"force_close": True}
+        return AioConfig(
+            max_pool_connections=self.clients.max_pool_connections,
+            connect_timeout=self.clients.connect_timeout,
+            read_timeout=self.clients.read_timeout,
+            retries={"mode": self.clients.retry_mode, "total_max_attempts": max_attempts},
+            connector_args=connector_args,
+        )
+
+    async def client(self, service: str, region: str, max_attempts: Optional[int] = None):
+        attempts = max_attempts or self.clients.retry_max_attempts
+        key = (service, region, attempts)
+        client = self._clients.get(key)
+        if client is None:
+            async with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    if self._session is None:
+                        from aiobotocore.session import get_session
+                        self._session = get_session()
+                    context = self._session.create_client(service, region_name=region, config=self.config(attempts))
+                    client = await context.__aenter__()
+                    self._contexts[key] = context
+                    self._clients[key] = client
+                    logger.info(f"[AWS] Created async {service} client for {region} (pool {self.clients.max_pool_connections}, attempts {attempts}).")
+        return client
+
+    async def close(self):
+        for key, context in list(self._contexts.items()):
+            try:
+                await context.__aexit__(None, None, None)
+            except Exception as e:
+                logger.warning(f"[AWS] Failed to close async {key[0]} client: {e}")
+        self._contexts.clear()
+        self._clients.clear()
+
+aws_client_conf = AWSClientConfig()
+aws_clients = AWSClients(
+    max_pool_connections=int(aws_client_conf.aws_max_pool_connections),
+    connect_timeout=float(aws_client_conf.aws_connect_timeout),
+    read_timeout=float(aws_client_conf.aws_read_timeout),
+    tcp_keepalive=aws_client_conf.aws_tcp_keepalive == "enable",
+    retry_mode=aws_client_conf.aws_retry_mode,
+    retry_max_attempts=int(aws_client_conf.aws_retry_max_attempts),
+)
+async_aws_clients = AsyncAWSClients(aws_clients)
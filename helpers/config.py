@@ -15,6 +15,14 @@ class AppConfig(object):
     api_auth_key: str = os.getenv("API_AUTH_KEY", "")
     app_admin_email: str =  os.getenv("APP_ADMIN_EMAIL", "administrator@yang.app")
 
+@dataclass
+class AuthConfig(object):
+    """API authentication configuration class."""
+
+    api_auth_cache_ttl: str = os.getenv("API_AUTH_CACHE_TTL", "300")                # seconds
+    api_auth_refresh_interval: str = os.getenv("API_AUTH_REFRESH_INTERVAL", "60")    # seconds
+    api_auth_rotation_grace: str = os.getenv("API_AUTH_ROTATION_GRACE", "600")       # seconds
+
 @dataclass
 class AWSConfig(object):
     """AWS configuration class."""
@@ -23,9 +31,13 @@ class AWSConfig(object):
     
     aws_secret_name: str = os.getenv("AWS_SECRET_NAME", "")
 
+    bedrock_backend: str = os.getenv("BEDROCK_BACKEND", "aws")    # "aws" or "fake" (offline stand-in)
+    bedrock_client: str = os.getenv("BEDROCK_CLIENT", "sync")     # "sync" (boto3 in threads) or "async" (aiobotocore streaming)
+
     bedrock_model_claude_text_id: str = os.getenv("BEDROCK_MODEL_CLAUDE_TEXT_ID", "")
     bedrock_model_claude_text_max_tokens: str = os.getenv("BEDROCK_MODEL_CLAUDE_TEXT_MAX_TOKENS", "2048")
     bedrock_model_claude_text_temperature: str = os.getenv("BEDROCK_MODEL_CLAUDE_TEXT_TEMPERATURE", "0.7")
+    bedrock_model_claude_text_prompt_cache: str = os.getenv("BEDROCK_MODEL_CLAUDE_TEXT_PROMPT_CACHE", "enable")
 
     bedkrock_model_claude_vision_id: str = os.getenv("BEDROCK_MODEL_CLAUDE_VISION_ID", "")
     bedrock_model_claude_vision_max_tokens: str = os.getenv("BEDROCK_MODEL_CLAUDE_VISION_MAX_TOKENS", "2048")
@@ -35,6 +47,46 @@ class AWSConfig(object):
     bedrock_guardrail_id: str = os.getenv("BEDROCK_GUARDRAIL_ID", "")
     bedrock_guardrail_version: str = os.getenv("BEDROCK_GUARDRAIL_VERSION", "")
 
+@dataclass
+class AWSClientConfig(object):
+    """Shared botocore client configuration class."""
+
+    aws_max_pool_connections: str = os.getenv("AWS_MAX_POOL_CONNECTIONS", "64")   # HTTP connections per client
+    aws_connect_timeout: str = os.getenv("AWS_CONNECT_TIMEOUT", "5")               # seconds
+    aws_read_timeout: str = os.getenv("AWS_READ_TIMEOUT", "120")                   # seconds between bytes, covers slow streams
+    aws_tcp_keepalive: str = os.getenv("AWS_TCP_KEEPALIVE", "enable")
+    aws_retry_mode: str = os.getenv("AWS_RETRY_MODE", "standard")                  # "legacy", "standard" or "adaptive"
+    aws_retry_max_attempts: str = os.getenv("AWS_RETRY_MAX_ATTEMPTS", "3")         # total attempts, Bedrock runtime uses 1
+
+@dataclass
+class ThrottleConfig(object):
+    """Bedrock rate limiting and retry configuration class."""
+
+    bedrock_default_rpm: str = os.getenv("BEDROCK_DEFAULT_RPM", "50")                  # requests per minute per model and region
+    bedrock_default_tpm: str = os.getenv("BEDROCK_DEFAULT_TPM", "200000")              # tokens per minute per model and region
+    bedrock_quotas: str = os.getenv("BEDROCK_QUOTAS", "{}")                            # JSON, e.g. {"<model_id>": {"rpm": 100, "tpm": 400000}}
+    bedrock_rate_max_wait: str = os.getenv("BEDROCK_RATE_MAX_WAIT", "10")              # seconds
+    bedrock_retry_max_attempts: str = os.getenv("BEDROCK_RETRY_MAX_ATTEMPTS", "4")
+    bedrock_retry_backoff_base: str = os.getenv("BEDROCK_RETRY_BACKOFF_BASE", "0.5")   # seconds
+    bedrock_retry_backoff_cap: str = os.getenv("BEDROCK_RETRY_BACKOFF_CAP", "8")       # seconds
+
+@dataclass
+class RoutingConfig(object):
+    """Multi-region Bedrock routing configuration class."""
+
+    bedrock_regions: str = os.getenv("BEDROCK_REGIONS", "")                            # comma-separated, defaults to AWS_REGION
+    bedrock_region_ewma_alpha: str = os.getenv("BEDROCK_REGION_EWMA_ALPHA", "0.2")
+    bedrock_region_error_penalty: str = os.getenv("BEDROCK_REGION_ERROR_PENALTY", "4")  # score multiplier per unit of error rate
+    bedrock_region_cooldown: str = os.getenv("BEDROCK_REGION_COOLDOWN", "30")          # seconds a failing region is deprioritized
+
+@dataclass
+class SecretConfig(object):
+    """Secret store configuration class."""
+
+    secret_backend: str = os.getenv("SECRET_BACKEND", "aws")                         # "aws", "file" or "env"
+    secret_file_path: str = os.getenv("SECRET_FILE_PATH", "secrets.json")
+    secret_refresh_interval: str = os.getenv("SECRET_REFRESH_INTERVAL", "300")       # seconds, 0 disables
+
 @dataclass
 class DatabaseConfig(object):
     """Database configuration class."""
@@ -45,6 +97,131 @@ class DatabaseConfig(object):
     db_port: str = os.getenv("DB_PORT", "5432")
     db_username_key: str = os.getenv("DB_USERNAME_KEY", "")
     db_pwd_key: str = os.getenv("DB_PWD_KEY", "")
+    db_message_page_size: str = os.getenv("DB_MESSAGE_PAGE_SIZE", "50")
+    db_message_page_size_max: str = os.getenv("DB_MESSAGE_PAGE_SIZE_MAX", "500")
+    db_message_export_batch_size: str = os.getenv("DB_MESSAGE_EXPORT_BATCH_SIZE", "1000")
+
+@dataclass
+class ToolConfig(object):
+    """Agent tool configuration class."""
+
+    tool_registry_poll_interval: str = os.getenv("TOOL_REGISTRY_POLL_INTERVAL", "30")   # seconds, 0 disables
+    tool_executor_max_workers: str = os.getenv("TOOL_EXECUTOR_MAX_WORKERS", "16")
+    tool_max_concurrency: str = os.getenv("TOOL_MAX_CONCURRENCY", "4")                 # per tool
+    tool_timeout: str = os.getenv("TOOL_TIMEOUT", "15")                                 # seconds
+    tool_timeouts: str = os.getenv("TOOL_TIMEOUTS", "{}")                               # JSON, e.g. {"arxiv": 30}
+    tool_circuit_failure_threshold: str = os.getenv("TOOL_CIRCUIT_FAILURE_THRESHOLD", "5")
+    tool_circuit_cooldown: str = os.getenv("TOOL_CIRCUIT_COOLDOWN", "60")               # seconds
+    tool_step_max_parallel: str = os.getenv("TOOL_STEP_MAX_PARALLEL", "4")             # tool calls per agent step
+    tool_step_time_budget: str = os.getenv("TOOL_STEP_TIME_BUDGET", "30")              # seconds per agent step
+
+@dataclass
+class KnowledgeBaseConfig(object):
+    """Knowledge base retrieval configuration class."""
+
+    kb_results_per_kb: str = os.getenv("KB_RESULTS_PER_KB", "5")          # numberOfResults asked from each knowledge base
+    kb_top_k: str = os.getenv("KB_TOP_K", "8")                            # passages kept after merging
+    kb_min_score: str = os.getenv("KB_MIN_SCORE", "0")
+    kb_ids_cache_ttl: str = os.getenv("KB_IDS_CACHE_TTL", "60")           # seconds
+    kb_backend: str = os.getenv("KB_BACKEND", "bedrock")                  # "bedrock" or "local"
+    kb_local_path: str = os.getenv("KB_LOCAL_PATH", "data/kb")            # one index directory per knowledge base id
+    kb_local_embeddings: str = os.getenv("KB_LOCAL_EMBEDDINGS", "local")  # "local" or "bedrock"
+    kb_local_embedding_model_id: str = os.getenv("KB_LOCAL_EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+    kb_local_embedding_dim: str = os.getenv("KB_LOCAL_EMBEDDING_DIM", "1024")
+    kb_local_ivf_nprobe: str = os.getenv("KB_LOCAL_IVF_NPROBE", "8")      # inverted lists scanned per query
+    kb_local_ivf_min_rows: str = os.getenv("KB_LOCAL_IVF_MIN_ROWS", "50000")  # brute force below this size
+
+@dataclass
+class CacheConfig(object):
+    """In-process cache configuration class."""
+
+    agent_cache_max_size: str = os.getenv("AGENT_CACHE_MAX_SIZE", "32")
+    model_registry_poll_interval: str = os.getenv("MODEL_REGISTRY_POLL_INTERVAL", "60")  # seconds, 0 disables
+
+    tool_cache_default_ttl: str = os.getenv("TOOL_CACHE_DEFAULT_TTL", "900")            # seconds, 0 disables
+    tool_cache_ttls: str = os.getenv("TOOL_CACHE_TTLS", '{"asknews": 300, "openweather": 600, "google_trends": 3600, "wikipedia": 86400, "arxiv": 86400, "knowledge_base": 600}')
+    tool_cache_max_entries: str = os.getenv("TOOL_CACHE_MAX_ENTRIES", "2048")
+    tool_cache_max_bytes: str = os.getenv("TOOL_CACHE_MAX_BYTES", "33554432")          # 32 MB
+    tool_cache_redis_url: str = os.getenv("TOOL_CACHE_REDIS_URL", "")                  # optional, requires `redis`
+
+@dataclass
+class ResponseCacheConfig(object):
+    """LLM response cache configuration class."""
+
+    response_cache_enable: str = os.getenv("RESPONSE_CACHE_ENABLE", "disable")
+    response_cache_ttl: str = os.getenv("RESPONSE_CACHE_TTL", "3600")                       # seconds
+    response_cache_max_entries: str = os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000")
+    response_cache_similarity_threshold: str = os.getenv("RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0.92")  # 1 disables the semantic tier
+    response_cache_embeddings: str = os.getenv("RESPONSE_CACHE_EMBEDDINGS", "bedrock")      # "bedrock", or "local" (exact tier only)
+    response_cache_embedding_model_id: str = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+    response_cache_embedding_dim: str = os.getenv("RESPONSE_CACHE_EMBEDDING_DIM", "1024")
+    response_cache_replay_chunk_size: str = os.getenv("RESPONSE_CACHE_REPLAY_CHUNK_SIZE", "24")  # characters
+
+@dataclass
+class SessionConfig(object):
+    """Server-side conversation store configuration class."""
+
+    session_cache_max_sessions: str = os.getenv("SESSION_CACHE_MAX_SESSIONS", "1000")
+    session_max_messages: str = os.getenv("SESSION_MAX_MESSAGES", "200")                # per session
+
+@dataclass
+class WriterConfig(object):
+    """Write-behind message persistence configuration class."""
+
+    message_writer_max_queue: str = os.getenv("MESSAGE_WRITER_MAX_QUEUE", "10000")
+    message_writer_batch_size: str = os.getenv("MESSAGE_WRITER_BATCH_SIZE", "200")
+    message_writer_flush_interval: str = os.getenv("MESSAGE_WRITER_FLUSH_INTERVAL", "1.0")      # seconds
+    message_writer_enqueue_timeout: str = os.getenv("MESSAGE_WRITER_ENQUEUE_TIMEOUT", "2.0")    # seconds
+
+@dataclass
+class ContextConfig(object):
+    """Conversation context window configuration class."""
+
+    context_max_tokens: str = os.getenv("CONTEXT_MAX_TOKENS", "32000")                  # default budget, 0 disables
+    context_trim_mode: str = os.getenv("CONTEXT_TRIM_MODE", "drop")                     # "drop" or "summary"
+    context_summary_cache_size: str = os.getenv("CONTEXT_SUMMARY_CACHE_SIZE", "512")
+
+@dataclass
+class AdmissionConfig(object):
+    """Completion admission control configuration class."""
+
+    admission_max_concurrent: str = os.getenv("ADMISSION_MAX_CONCURRENT", "64")         # streams per worker
+    admission_max_per_credential: str = os.getenv("ADMISSION_MAX_PER_CREDENTIAL", "16")
+    admission_max_queue: str = os.getenv("ADMISSION_MAX_QUEUE", "128")
+    admission_queue_timeout: str = os.getenv("ADMISSION_QUEUE_TIMEOUT", "10")            # seconds
+
+@dataclass
+class AttachmentConfig(object):
+    """Attachment decoding and cache configuration class."""
+
+    attachment_max_file_bytes: str = os.getenv("ATTACHMENT_MAX_FILE_BYTES", "4718592")          # 4.5 MB decoded, Bedrock's document limit
+    attachment_max_image_bytes: str = os.getenv("ATTACHMENT_MAX_IMAGE_BYTES", "20971520")        # 20 MB uploaded, before downscaling
+    attachment_max_request_bytes: str = os.getenv("ATTACHMENT_MAX_REQUEST_BYTES", "52428800")    # 50 MB decoded per request
+    attachment_cache_memory_bytes: str = os.getenv("ATTACHMENT_CACHE_MEMORY_BYTES", "134217728") # 128 MB
+    attachment_cache_disk_bytes: str = os.getenv("ATTACHMENT_CACHE_DISK_BYTES", "1073741824")    # 1 GB, 0 disables spilling
+    attachment_cache_dir: str = os.getenv("ATTACHMENT_CACHE_DIR", "")                            # empty: a temporary directory
+    attachment_decode_chunk_bytes: str = os.getenv("ATTACHMENT_DECODE_CHUNK_BYTES", "1048576")
+    attachment_inline_decode_bytes: str = os.getenv("ATTACHMENT_INLINE_DECODE_BYTES", "65536")   # smaller payloads decode on the loop
+
+@dataclass
+class ImageConfig(object):
+    """Image pre-processing configuration class."""
+
+    image_preprocess: str = os.getenv("IMAGE_PREPROCESS", "enable")
+    image_max_edge: str = os.getenv("IMAGE_MAX_EDGE", "1568")            # px; Claude downscales anything larger itself
+    image_max_pixels: str = os.getenv("IMAGE_MAX_PIXELS", "1150000")     # ~1.15 MP, the model's effective resolution
+    image_quality: str = os.getenv("IMAGE_QUALITY", "85")                # JPEG/WebP re-encode quality
+    image_workers: str = os.getenv("IMAGE_WORKERS", "2")                 # processes
+    image_cache_bytes: str = os.getenv("IMAGE_CACHE_BYTES", "67108864")  # 64 MB of processed base64
+
+@dataclass
+class StreamConfig(object):
+    """Completion streaming configuration class."""
+
+    stream_coalesce_ms: str = os.getenv("STREAM_COALESCE_MS", "40")                  # max delay before buffered text is sent
+    stream_coalesce_bytes: str = os.getenv("STREAM_COALESCE_BYTES", "512")           # flush once this much text is buffered
+    stream_heartbeat_interval: str = os.getenv("STREAM_HEARTBEAT_INTERVAL", "15")    # seconds, SSE mode only
+    stream_disconnect_poll_interval: str = os.getenv("STREAM_DISCONNECT_POLL_INTERVAL", "0.5")  # seconds
 
 @dataclass
 class LogConfig(object):
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Literal, Union, Dict, Any
 
 class ImageSource(BaseModel):
@@ -25,8 +25,9 @@ class ChatAgentMessage(BaseModel):
     content: Union[str, List[ContentBlock]]
 
 class ChatAgentRequest(BaseModel):
-    chat_session_id: Optional[str] = None
+    chat_session_id: Optional[str] = Field(default=None, max_length=64)  # messages.session_id is String(64)
     model_name: Optional[str] = None
+    stream_format: Optional[Literal["raw", "sse"]] = None  # defaults from the Accept header
     messages: List[ChatAgentMessage]
 
 class ChatLLMMessage(BaseModel):
@@ -34,6 +35,7 @@ class ChatLLMMessage(BaseModel):
     content: Union[str, List[ContentBlock]]
 
 class ChatLLMRequest(BaseModel):
-    chat_session_id: Optional[str] = None
+    chat_session_id: Optional[str] = Field(default=None, max_length=64)  # messages.session_id is String(64)
     model_name: Optional[str] = None
+    stream_format: Optional[Literal["raw", "sse"]] = None  # defaults from the Accept header
     messages: List[ChatLLMMessage]
\ No newline at end of file
@@ -0,0 +1,184 @@
+import io
+import math
+import time
+import base64
+import asyncio
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import ImageConfig
+from helpers.attachments import attachment_store
+
+# Pillow format -> (save format, media type); anything else is re-encoded as PNG
+OUTPUT_FORMATS = {"JPEG": ("JPEG", "image/jpeg"), "MPO": ("JPEG", "image/jpeg"), "WEBP": ("WEBP", "image/webp")}
+ORIENTATION_TAG = 0x0112
+
+def normalize_image(encoded: str, max_edge: int, max_pixels: int, quality: int) -> Optional[Tuple[str, str, int, int, bool]]:
+    """
+    Runs in a worker process. Downscales a base64 image to fit `max_edge` and
+    `max_pixels`, applies the EXIF orientation and re-encodes without metadata.
+    Returns (media type, base64 data, original bytes, new bytes, resized), or
+    None when the image is already small and has no metadata to strip.
+    """
+    from PIL import Image, ImageOps
+
+    raw = base64.b64decode(encoded)
+    image = Image.open(io.BytesIO(raw))
+    source_format = image.format
+    if getattr(image, "n_frames", 1) > 1:
+        return None  # animations are passed through
+
+    width, height = image.size
+    scale = min(1.0, max_edge / max(width, height), math.sqrt(max_pixels / (width * height)))
+    has_metadata = bool(image.info.get("exif") or image.info.get("xmp") or image.info.get("comment") or image.getexif())
+    if scale >= 1.0 and not has_metadata:
+        return None
+
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if scale < 1.0:
+        # JPEG decodes straight to a reduced scale (1/2, 1/4, 1/8) no smaller than the target
+        image.draft(image.mode, size)
+    orientation = image.getexif().get(ORIENTATION_TAG, 1)
+    image = ImageOps.exif_transpose(image)
+    if orientation in (5, 6, 7, 8):
+        size = (size[1], size[0])
+    if scale < 1.0:
+        image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+    save_format, media_type = OUTPUT_FORMATS.get(source_format, ("PNG", "image/png"))
+    options = {}
+    if save_format == "JPEG":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        options = {"quality": quality, "optimize": True}
+    elif save_format == "WEBP":
+        options = {"quality": quality}
+    icc_profile = image.info.get("icc_profile")
+    if icc_profile:
+        options["icc_profile"] = icc_profile  # colour profile, not metadata
+
+    out = io.BytesIO()
+    image.save(out, save_format, **options)
+    data = out.getvalue()
+    return media_type, base64.b64encode(data).decode("ascii"), len(raw), len(data), scale < 1.0
+
+class ImageProcessor(object):
+    """
+    Shrinks images before they are sent to Bedrock: anything above the model's
+    effective resolution is downscaled, and EXIF/XMP metadata is stripped.
+    Pillow runs in a process pool (CPU-bound, holds the GIL); results are cached
+    by the SHA-256 of the uploaded base64 text, so history re-sends are free.
+    """
+
+    def __init__(self, enabled: bool, max_edge: int, max_pixels: int, quality: int, workers: int, cache_bytes: int):
+        self.enabled = enabled
+        self.max_edge = max_edge
+        self.max_pixels = max_pixels
+        self.quality = quality
+        self.workers = workers
+        self.cache_bytes = cache_bytes
+        self.cache_size = 0
+        # Value None: the image is kept as uploaded
+        self._cache: "OrderedDict[str, Optional[Tuple[str, str]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork a process that is running the event loop and client threads
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _cache_set(self, key: str, value: Optional[Tuple[str, str]]):
+        size = len(value[1]) if value else 0
+        if size > self.cache_bytes:
+            return
+        self._cache[key] = value
+        self.cache_size += size
+        while self.cache_size > self.cache_bytes:
+            _, old = self._cache.popitem(last=False)
+            self.cache_size -= len(old[1]) if old else 0
+
+    async def _process(self, encoded: str) -> Optional[Tuple[str, str]]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(self.pool(), normalize_image, encoded, self.max_edge, self.max_pixels, self.quality)
+        except BrokenProcessPool as e:
+            logger.error(f"[Images] Worker pool broke, recreating it: {e}")
+            self._pool = None
+            metrics.incr("image_preprocess_total", result="failed")
+            raise
+        except Exception as e:
+            logger.warning(f"[Images] Pre-processing failed, sending the image as uploaded: {e}")
+            metrics.incr("image_preprocess_total", result="failed")
+            return None
+        finally:
+            metrics.observe("image_preprocess_ms", (time.perf_counter() - started) * 1000)
+
+        if result is None:
+            metrics.incr("image_preprocess_total", result="unchanged")
+            return None
+        media_type, data, original_size, new_size, resized = result
+        # Not resized means re-encoded only to strip metadata; the clean copy is sent even if larger
+        metrics.incr("image_preprocess_total", result="resized" if resized else "stripped")
+        metrics.incr("image_bytes_in_total", original_size)
+        metrics.incr("image_bytes_saved_total", max(0, original_size - new_size))
+        return media_type, data
+
+    async def normalize(self, encoded: str) -> Optional[Tuple[str, str]]:
+        """(media type, base64 data) to send instead of `encoded`, or None to send it as is."""
+        if not self.enabled or not encoded:
+            return None
+        key = await attachment_store.key(encoded)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            metrics.incr("image_cache_hits_total")
+            return self._cache[key]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            try:
+                value = await self._process(encoded)
+            except BrokenProcessPool:
+                value = None
+            else:
+                self._cache_set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def normalize_many(self, encoded: List[str]) -> Dict[str, Tuple[str, str]]:
+        """Replacements for the distinct images of a request, keyed by their uploaded base64 data."""
+        unique = list(dict.fromkeys(e for e in encoded if e))
+        results = await asyncio.gather(*(self.normalize(e) for e in unique))
+        return {e: r for e, r in zip(unique, results) if r is not None}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+image_conf = ImageConfig()
+image_processor = ImageProcessor(
+    enabled=image_conf.image_preprocess == "enable",
+    max_edge=int(image_conf.image_max_edge),
+    max_pixels=int(image_conf.image_max_pixels),
+    quality=int(image_conf.image_quality),
+    workers=int(image_conf.image_workers),
+    cache_bytes=int(image_conf.image_cache_bytes),
+)
@@ -1,35 +1,187 @@
-import boto3
-from helpers.config import AppConfig, AWSConfig
-from botocore.exceptions import ClientError
+import os
+import ast
+import json
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from helpers.config import AppConfig, AWSConfig, SecretConfig
+from botocore.exceptions import BotoCoreError, ClientError
 from helpers.loog import logger
+from helpers.aws import aws_clients
+
+SECRET_FETCH_ERRORS = (ClientError, BotoCoreError, OSError, ValueError, SyntaxError)
+
+def parse_secret_string(secret_value: str) -> Dict[str, Any]:
+    """Parse a secret blob as JSON, accepting legacy Python-literal dicts without eval()."""
+    try:
+        parsed = json.loads(secret_value)
+    except (TypeError, ValueError):
+        parsed = ast.literal_eval(secret_value)
+    if not isinstance(parsed, dict):
+        raise ValueError("Secret value must be a key/value object")
+    return parsed
+
+@dataclass(frozen=True)
+class SecretSnapshot(object):
+    """Immutable view of the whole secret at one point in time."""
+
+    values: Dict[str, Any] = field(default_factory=dict)
+    version: str = ""
+    updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def get(self, secret_key: str, default: Any = "") -> Any:
+        return self.values.get(secret_key, default)
+
+class AWSSecretBackend(object):
+    """Reads the secret from AWS Secrets Manager."""
+
+    def __init__(self, secret_name: str, region_name: str):
+        self.secret_name = secret_name
+        self.region_name = region_name
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = aws_clients.client("secretsmanager", self.region_name)
+        return self._client
+
+    def fetch(self) -> Tuple[Dict[str, Any], str]:
+        response = self.client.get_secret_value(SecretId=self.secret_name)
+        return parse_secret_string(response['SecretString']), response.get('VersionId', "")
+
+class FileSecretBackend(object):
+    """Reads the secret from a local JSON file, for offline runs and tests."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def fetch(self) -> Tuple[Dict[str, Any], str]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = f.read()
+        return parse_secret_string(raw), hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+class EnvSecretBackend(object):
+    """Serves secret keys straight from environment variables."""
+
+    def fetch(self) -> Tuple[Dict[str, Any], str]:
+        values = dict(os.environ)
+        digest = hashlib.sha256(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        return values, digest
 
 class AWSSecretManager(object):
+    """
+    Whole-secret snapshot cache.
+    The secret is fetched once, every key is served from memory, and the
+    snapshot is refreshed in the background every `secret_refresh_interval` seconds.
+    """
 
     def __init__(self):
         self.app_conf = AppConfig()
         self.aws_conf = AWSConfig()
-        self._client = None
-    
+        self.secret_conf = SecretConfig()
+        self.backend = self._create_backend()
+        self.refresh_interval = float(self.secret_conf.secret_refresh_interval)
+
+        self._snapshot: Optional[SecretSnapshot] = None
+        self._listeners: List[Callable[[SecretSnapshot], None]] = []
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _create_backend(self):
+        backend = self.secret_conf.secret_backend.lower()
+        if backend == "file":
+            return FileSecretBackend(self.secret_conf.secret_file_path)
+        if backend == "env":
+            return EnvSecretBackend()
+        return AWSSecretBackend(self.aws_conf.aws_secret_name, self.aws_conf.aws_region)
+
     @property
     def client(self):
-        if self._client is None:
-            session = boto3.session.Session()
-            self._client = session.client(
-                service_name='secretsmanager',
-                region_name=self.aws_conf.aws_region
-            )
-        return self._client
-    
-    def get_secret(self, secret_key: str) -> str:
+        return getattr(self.backend, "client", None)
+
+    @property
+    def snapshot(self) -> Optional[SecretSnapshot]:
+        if self._snapshot is None:
+            self.refresh()
+        return self._snapshot
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._snapshot.version if self._snapshot else None
+
+    @property
+    def updated_at(self) -> Optional[datetime]:
+        return self._snapshot.updated_at if self._snapshot else None
+
+    def subscribe(self, callback: Callable[[SecretSnapshot], None]):
+        """Register a callback invoked with the new snapshot whenever the secret version changes."""
+        self._listeners.append(callback)
+
+    def _fetch_snapshot(self) -> SecretSnapshot:
+        values, version = self.backend.fetch()
+        return SecretSnapshot(values=values, version=version or "")
+
+    def _apply(self, snapshot: SecretSnapshot):
+        previous = self._snapshot
+        self._snapshot = snapshot
+        if previous is not None and previous.version != snapshot.version:
+            logger.info(f"[BE-AWS] Secret rotated to version {snapshot.version}")
+            for callback in self._listeners:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    logger.error(f"[BE-AWS] Secret rotation listener failed: {e}")
+
+    def refresh(self) -> bool:
+        """Blocking refresh of the snapshot. Returns False and keeps the old snapshot on failure."""
         try:
-            
-            get_secret_value_response = self.client.get_secret_value(
-                SecretId=self.aws_conf.aws_secret_name
-            )
-            secret_value = get_secret_value_response['SecretString']
-            secret = eval(secret_value).get(secret_key, "")
-
-            return secret
-        except ClientError as e:
-            logger.error(f"[BE-AWS] Error retrieving secret {secret_key}: {e}")
-            return None
\ No newline at end of file
+            self._apply(self._fetch_snapshot())
+            return True
+        except SECRET_FETCH_ERRORS as e:
+            logger.error(f"[BE-AWS] Error refreshing secret: {e}")
+            return False
+
+    async def arefresh(self) -> bool:
+        """Refresh the snapshot without blocking the event loop."""
+        try:
+            snapshot = await asyncio.to_thread(self._fetch_snapshot)
+        except SECRET_FETCH_ERRORS as e:
+            logger.error(f"[BE-AWS] Error refreshing secret: {e}")
+            return False
+        self._apply(snapshot)
+        return True
+
+    def get_secret(self, secret_key: str) -> str:
+        snapshot = self.snapshot
+        if snapshot is None:
+            logger.error(f"[BE-AWS] Error retrieving secret {secret_key}: no snapshot available")
+            return None
+        return snapshot.get(secret_key, "")
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            # A malformed secret (binary, not a JSON object) must not end the loop
+            try:
+                await self.arefresh()
+            except Exception as e:
+                logger.error(f"[BE-AWS] Unexpected error refreshing secret: {e}")
+
+    async def start(self):
+        if self._snapshot is None:
+            await self.arefresh()
+        if self._refresh_task is None and self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+aws_secret_manager = AWSSecretManager()
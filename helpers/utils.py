@@ -1,12 +1,10 @@
 import base64
+import asyncio
 from typing import List, Optional
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from helpers.datamodel import ChatAgentMessage
-from helpers.secret import AWSSecretManager
-from helpers.config import AppConfig
-
-app_conf = AppConfig()
-aws_secret_manager = AWSSecretManager()
+from helpers.attachments import attachment_store
+from helpers.images import image_processor
 
 class Utils:
     def __init__(self):
@@ -21,11 +19,42 @@ class Utils:
         except Exception:
             return None
         
-    def format_agent_messages(messages: List[ChatAgentMessage]) -> List[Dict[str, Any]]:
+    def attachment_data(messages: List[ChatAgentMessage]) -> Tuple[List[str], List[str]]:
+        """Base64 payloads of the (image, document) blocks, in message order."""
+        images, documents = [], []
+        for msg in messages:
+            if not isinstance(msg.content, list):
+                continue
+            for block in msg.content:
+                block_dict = block if isinstance(block, dict) else block.model_dump(exclude_none=True)
+                if block_dict.get("type") == "image" and "source" in block_dict:
+                    images.append(block_dict["source"].get("data") or "")
+                elif "document" in block_dict:
+                    source = block_dict["document"].get("source") or {}
+                    if source.get("bytes"):
+                        documents.append(source["bytes"])
+        return images, documents
+
+    async def aformat_agent_messages(messages: List[ChatAgentMessage]) -> List[Dict[str, Any]]:
+        """
+        format_agent_messages with attachment size limits (AttachmentTooLarge) and
+        documents decoded through the attachment store: off the event loop, and
+        only once for an attachment that is re-sent with the history. Images are
+        downscaled and stripped of metadata by the image processor.
+        """
+        images, documents = Utils.attachment_data(messages)
+        attachment_store.check_limits(documents, images)
+        decoded, processed = await asyncio.gather(attachment_store.decode_many(documents), image_processor.normalize_many(images))
+        return Utils.format_agent_messages(messages, decoded, processed)
+
+    def format_agent_messages(messages: List[ChatAgentMessage], documents: Optional[Dict[str, Optional[bytes]]] = None,
+                              images: Optional[Dict[str, Tuple[str, str]]] = None) -> List[Dict[str, Any]]:
         """
         Ensure message structure is Claude-compatible.
         - If message content is str, wrap into [{"type": "text", "text": ...}]
         - If message content is already a list of content blocks, pass through.
+        Document bytes are taken from `documents` (base64 -> bytes) and image
+        sources from `images` (base64 -> (media type, base64)) when given.
         """
         formatted = []
 
@@ -46,13 +75,20 @@ class Utils:
 
                     # 🖼️ Image block (base64 data remains string)
                     if block_dict.get("type") == "image" and "source" in block_dict:
+                        if images and block_dict["source"].get("data") in images:
+                            media_type, data = images[block_dict["source"]["data"]]
+                            block_dict["source"] = {**block_dict["source"], "media_type": media_type, "data": data}
                         content_blocks.append(block_dict)
 
                     # 📄 Document block (decode base64 -> raw bytes)
                     elif "document" in block_dict:
                         doc = block_dict["document"]
                         if "source" in doc and "bytes" in doc["source"]:
-                            decoded_bytes = Utils.decode_base64_data(doc["source"]["bytes"])
+                            encoded = doc["source"]["bytes"]
+                            if documents is not None and encoded in documents:
+                                decoded_bytes = documents[encoded]
+                            else:
+                                decoded_bytes = Utils.decode_base64_data(encoded)
                             doc["source"]["bytes"] = decoded_bytes
                         content_blocks.append({"document": doc})
 
@@ -66,11 +102,3 @@ class Utils:
                 })
                 
         return formatted
-
-    def check_api_authentication(authorization_header):
-        credential = authorization_header.split(" ")[1]
-        
-        api_credential = aws_secret_manager.get_secret(app_conf.api_auth_key)
-        if credential != api_credential:
-            return False
-        return True
\ No newline at end of file
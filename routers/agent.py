@@ -5,6 +5,8 @@ from databases.crud import (
     create_agent, get_agents, get_agent, update_agent, delete_agent
 )
 from databases.database import SessionLocal
+from bedrock.cache import agent_cache
+from bedrock.retriever import kb_retriever
 
 router = APIRouter(prefix="/agents", tags=["Agents"])
 
@@ -12,7 +14,10 @@ router = APIRouter(prefix="/agents", tags=["Agents"])
 @router.post("/", response_model=AgentOut)
 async def create_agent_route(data: AgentCreate, db: AsyncSession = Depends(SessionLocal)):
     print("DEBUG")
-    return await create_agent(db, data)
+    agent = await create_agent(db, data)
+    agent_cache.invalidate()
+    kb_retriever.invalidate()
+    return agent
 
 
 @router.get("/", response_model=list[AgentOut])
@@ -34,6 +39,8 @@ async def update_agent_route(agent_id: int, data: AgentUpdate, db: AsyncSession
     agent = await update_agent(db, agent_id, data)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
+    agent_cache.invalidate()
+    kb_retriever.invalidate()
     return agent
 
 
@@ -42,3 +49,5 @@ async def delete_agent_route(agent_id: int, db: AsyncSession = Depends(SessionLo
     result = await delete_agent(db, agent_id)
     if not result:
         raise HTTPException(status_code=404, detail="Agent not found")
+    agent_cache.invalidate()
+    kb_retriever.invalidate()
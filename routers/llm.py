@@ -6,13 +6,21 @@ from databases.crud import (
     create_llm, get_llms, get_llm, update_llm, delete_llm
 )
 from databases.database import SessionLocal
+from bedrock.cache import agent_cache
+from bedrock.registry import model_registry
+from bedrock.response_cache import response_cache
 
 router = APIRouter(prefix="/llms", tags=["LLMs"])
 
 
 @router.post("/", response_model=LLMOut)
 async def create_llm_route(data: LLMCreate, db: AsyncSession = Depends(SessionLocal)):
-    return await create_llm(db, data)
+    llm = await create_llm(db, data)
+    agent_cache.invalidate()
+    await model_registry.reload()
+    if response_cache is not None:
+        response_cache.clear()
+    return llm
 
 
 @router.get("/", response_model=list[LLMOut])
@@ -33,6 +41,10 @@ async def update_llm_route(llm_id: int, data: LLMUpdate, db: AsyncSession = Depe
     llm = await update_llm(db, llm_id, data)
     if not llm:
         raise HTTPException(status_code=404, detail="LLM not found")
+    agent_cache.invalidate()
+    await model_registry.reload()
+    if response_cache is not None:
+        response_cache.clear()
     return llm
 
 
@@ -41,3 +53,7 @@ async def delete_llm_route(llm_id: int, db: AsyncSession = Depends(SessionLocal)
     result = await delete_llm(db, llm_id)
     if not result:
         raise HTTPException(status_code=404, detail="LLM not found")
+    agent_cache.invalidate()
+    await model_registry.reload()
+    if response_cache is not None:
+        response_cache.clear()
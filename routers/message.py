@@ -1,13 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import base64
+from datetime import datetime
+from typing import Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from databases.schemas import MessageCreate, MessageOut
+from databases.schemas import MessageCreate, MessageOut, MessagePage
 from databases.crud import (
-    create_message, get_message, get_user_messages, delete_message
+    create_message, get_message, get_user_messages, stream_user_messages, delete_message
 )
 from databases.database import SessionLocal
+from helpers.config import DatabaseConfig
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
+db_conf = DatabaseConfig()
+
+
+def encode_cursor(timestamp: datetime, message_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{message_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, message_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(timestamp), int(message_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.post("/", response_model=MessageOut)
@@ -15,9 +35,36 @@ async def create_message_route(data: MessageCreate, db: AsyncSession = Depends(S
     return await create_message(db, data)
 
 
-@router.get("/user/{user_id}", response_model=list[MessageOut])
-async def list_user_messages(user_id: int, db: AsyncSession = Depends(SessionLocal)):
-    return await get_user_messages(db, user_id)
+@router.get("/user/{user_id}", response_model=MessagePage)
+async def list_user_messages(
+    user_id: int,
+    limit: Optional[int] = Query(default=None, ge=1),
+    cursor: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+    db: AsyncSession = Depends(SessionLocal),
+):
+    page_size = min(limit or int(db_conf.db_message_page_size), int(db_conf.db_message_page_size_max))
+    after = decode_cursor(cursor) if cursor else None
+
+    items, has_more = await get_user_messages(db, user_id, page_size, after=after, descending=order == "desc")
+    next_cursor = encode_cursor(items[-1].timestamp, items[-1].id) if has_more and items else None
+    return MessagePage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/user/{user_id}/export")
+async def export_user_messages(user_id: int):
+    async def ndjson():
+        async with SessionLocal() as session:
+            async for msg in stream_user_messages(session, user_id, int(db_conf.db_message_export_batch_size)):
+                yield json.dumps({
+                    "id": msg.id,
+                    "session_id": msg.session_id,
+                    "role": msg.role,
+                    "content": msg.content,
+                    "timestamp": msg.timestamp.isoformat() if msg.timestamp else None,
+                }, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 
 @router.get("/{message_id}", response_model=MessageOut)
@@ -6,13 +6,18 @@ from databases.crud import (
     create_tool, get_tools, get_tool, update_tool, delete_tool, get_enabled_tools
 )
 from databases.database import SessionLocal
+from bedrock.cache import agent_cache
+from tools.registry import tool_registry
 
 router = APIRouter(prefix="/tools", tags=["Tools"])
 
 
 @router.post("/", response_model=ToolOut)
 async def create_tool_route(data: ToolCreate, db: AsyncSession = Depends(SessionLocal)):
-    return await create_tool(db, data)
+    tool = await create_tool(db, data)
+    await tool_registry.reload()
+    agent_cache.invalidate()
+    return tool
 
 
 @router.get("/", response_model=list[ToolOut])
@@ -38,6 +43,8 @@ async def update_tool_route(tool_id: int, data: ToolUpdate, db: AsyncSession = D
     tool = await update_tool(db, tool_id, data)
     if not tool:
         raise HTTPException(status_code=404, detail="Tool not found")
+    await tool_registry.reload()
+    agent_cache.invalidate()
     return tool
 
 
@@ -45,4 +52,6 @@ async def update_tool_route(tool_id: int, data: ToolUpdate, db: AsyncSession = D
 async def delete_tool_route(tool_id: int, db: AsyncSession = Depends(SessionLocal)):
     result = await delete_tool(db, tool_id)
     if not result:
-        raise HTTPException(status_code=404, detail="Tool not found")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="Tool not found")
+    await tool_registry.reload()
+    agent_cache.invalidate()
\ No newline at end of file
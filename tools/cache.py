@@ -0,0 +1,183 @@
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import CacheConfig
+
+class MemoryCacheBackend(object):
+    """TTL + LRU cache bounded by entry count and total string size."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, size = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: float):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value, size)
+        self.size_bytes += size
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+class RedisCacheBackend(object):
+    """Optional shared backend so several workers can reuse each other's tool results."""
+
+    def __init__(self, url: str):
+        # Imported lazily: redis is only needed when a shared cache is configured.
+        import redis.asyncio as redis
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._client.set(key, value, ex=max(1, int(ttl)))
+
+    async def close(self):
+        await self._client.aclose()
+
+class ToolResultCache(object):
+    """
+    Cache of tool results keyed by tool name and normalized query.
+    Concurrent identical lookups share a single upstream call (singleflight).
+    """
+
+    def __init__(self, memory: MemoryCacheBackend, default_ttl: float, ttls: Dict[str, float], shared: Optional[RedisCacheBackend] = None):
+        self.memory = memory
+        self.default_ttl = default_ttl
+        self.ttls = ttls
+        self.shared = shared
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+    def make_key(self, tool_name: str, query: str) -> str:
+        digest = hashlib.sha256(self.normalize(query).encode("utf-8")).hexdigest()
+        return f"tool:{tool_name}:{digest}"
+
+    def ttl_for(self, tool_name: str) -> float:
+        """TTL of a tool; scoped names like "knowledge_base:<id>" fall back to their prefix."""
+        if tool_name in self.ttls:
+            return self.ttls[tool_name]
+        return self.ttls.get(tool_name.split(":", 1)[0], self.default_ttl)
+
+    async def _shared_get(self, key: str) -> Optional[str]:
+        if self.shared is None:
+            return None
+        try:
+            return await self.shared.get(key)
+        except Exception as e:
+            logger.error(f"[ToolCache] Shared cache read failed: {e}")
+            return None
+
+    async def _shared_set(self, key: str, value: str, ttl: float):
+        if self.shared is None:
+            return
+        try:
+            await self.shared.set(key, value, ttl)
+        except Exception as e:
+            logger.error(f"[ToolCache] Shared cache write failed: {e}")
+
+    async def get_or_fetch(self, tool_name: str, query: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        ttl = self.ttl_for(tool_name)
+        if ttl <= 0:
+            return await fetch()
+
+        key = self.make_key(tool_name, query)
+        value = self.memory.get(key)
+        if value is not None:
+            metrics.incr("tool_cache_hits_total", tool=tool_name, tier="memory")
+            return value
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            metrics.incr("tool_cache_coalesced_total", tool=tool_name)
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The leading request was cancelled; fetch on our own behalf.
+                return await self.get_or_fetch(tool_name, query, fetch)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await self._shared_get(key)
+            if value is not None:
+                metrics.incr("tool_cache_hits_total", tool=tool_name, tier="shared")
+                self.memory.set(key, value, ttl)
+            else:
+                metrics.incr("tool_cache_misses_total", tool=tool_name)
+                value = await fetch()
+                if isinstance(value, str):
+                    self.memory.set(key, value, ttl)
+                    await self._shared_set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it.
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+            metrics.set_gauge("tool_cache_bytes", self.memory.size_bytes)
+
+    async def close(self):
+        if self.shared is not None:
+            await self.shared.close()
+
+def _create_shared_backend(url: str) -> Optional[RedisCacheBackend]:
+    if not url:
+        return None
+    try:
+        return RedisCacheBackend(url)
+    except ImportError:
+        logger.error("[ToolCache] TOOL_CACHE_REDIS_URL is set but the 'redis' package is not installed, using memory only.")
+        return None
+
+cache_conf = CacheConfig()
+tool_result_cache = ToolResultCache(
+    memory=MemoryCacheBackend(
+        max_entries=int(cache_conf.tool_cache_max_entries),
+        max_bytes=int(cache_conf.tool_cache_max_bytes),
+    ),
+    default_ttl=float(cache_conf.tool_cache_default_ttl),
+    ttls={k: float(v) for k, v in json.loads(cache_conf.tool_cache_ttls or "{}").items()},
+    shared=_create_shared_backend(cache_conf.tool_cache_redis_url),
+)
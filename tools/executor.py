@@ -0,0 +1,181 @@
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from helpers.loog import logger
+from helpers.metrics import metrics
+from helpers.config import ToolConfig
+
+class ToolExecutionError(Exception):
+    """Base error for tool calls that failed, timed out or were rejected."""
+
+class ToolTimeoutError(ToolExecutionError):
+    pass
+
+class CircuitOpenError(ToolExecutionError):
+    pass
+
+class CircuitBreaker(object):
+    """
+    Consecutive-failure circuit breaker.
+    - closed: calls flow; `failure_threshold` failures in a row open the circuit.
+    - open: calls are rejected until `cooldown` seconds have passed.
+    - half_open: a single trial call decides whether to close or re-open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Forget an abandoned half-open trial call without counting it as a failure."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+class ToolExecutor(object):
+    """
+    Runs blocking LangChain tool wrappers on a dedicated, bounded thread pool so
+    they never block the event loop. Each tool gets its own concurrency limit,
+    hard timeout and circuit breaker.
+    """
+
+    def __init__(self, max_workers: int, max_concurrency: int, default_timeout: float,
+                 failure_threshold: int, cooldown: float, timeouts: Optional[Dict[str, float]] = None):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.timeouts = timeouts or {}
+
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+        return self._pool
+
+    def breaker(self, tool_name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(tool_name)
+        if breaker is None:
+            breaker = self._breakers[tool_name] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return breaker
+
+    def _semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(tool_name)
+        if semaphore is None:
+            semaphore = self._semaphores[tool_name] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _submit(self, semaphore: asyncio.Semaphore, func: Callable[[], Any]) -> asyncio.Future:
+        """Start `func` on the pool; the semaphore slot is held until the thread finishes, not until the caller gives up."""
+        loop = asyncio.get_running_loop()
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # loop already closed
+
+        try:
+            future = self.pool.submit(func)
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(release)
+        return asyncio.wrap_future(future)
+
+    async def run(self, tool_name: str, func: Callable[[], Any]) -> Any:
+        """Run `func` off the event loop under the limits configured for `tool_name`."""
+        breaker = self.breaker(tool_name)
+        if not breaker.allow():
+            metrics.incr("tool_calls_total", tool=tool_name, outcome="rejected")
+            raise CircuitOpenError(f"temporarily unavailable, retry in {breaker.retry_after():.0f}s")
+
+        timeout = self.timeouts.get(tool_name, self.default_timeout)
+        started = time.perf_counter()
+        outcome = "success"
+        try:
+            # Queueing for a slot does not count towards the timeout
+            semaphore = self._semaphore(tool_name)
+            await semaphore.acquire()
+            # A timed-out call cannot be interrupted inside its worker thread; it keeps
+            # its slot until it returns, so a hung provider only exhausts its own limit.
+            result = await asyncio.wait_for(self._submit(semaphore, func), timeout=timeout)
+            breaker.record_success()
+            return result
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            breaker.record_failure()
+            raise ToolTimeoutError(f"timed out after {timeout:g}s")
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            outcome = "error"
+            breaker.record_failure()
+            logger.error(f"[Tool] {tool_name} failed: {e}")
+            raise ToolExecutionError(str(e)) from e
+        finally:
+            metrics.observe("tool_latency_ms", (time.perf_counter() - started) * 1000, tool=tool_name)
+            metrics.incr("tool_calls_total", tool=tool_name, outcome=outcome)
+            metrics.set_gauge("tool_circuit_open", int(breaker.state != CircuitBreaker.CLOSED), tool=tool_name)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+tool_conf = ToolConfig()
+tool_executor = ToolExecutor(
+    max_workers=int(tool_conf.tool_executor_max_workers),
+    max_concurrency=int(tool_conf.tool_max_concurrency),
+    default_timeout=float(tool_conf.tool_timeout),
+    failure_threshold=int(tool_conf.tool_circuit_failure_threshold),
+    cooldown=float(tool_conf.tool_circuit_cooldown),
+    timeouts={k: float(v) for k, v in json.loads(tool_conf.tool_timeouts or "{}").items()},
+)
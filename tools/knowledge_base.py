@@ -0,0 +1,18 @@
+from langchain.tools import tool
+from bedrock.retriever import kb_retriever
+
+def format_passages(passages) -> str:
+    """Numbered passages with their source, as handed back to the model."""
+    if not passages:
+        return "No relevant passages found in the knowledge base."
+    lines = []
+    for i, p in enumerate(passages, 1):
+        source = f" (source: {p.source})" if p.source else ""
+        lines.append(f"[{i}] score={p.score:.3f}{source}\n{p.text.strip()}")
+    return "\n\n".join(lines)
+
+@tool
+async def KnowledgeBase(search_query: str):
+    """Search the organization's internal knowledge bases for documents relevant to the query."""
+    passages = await kb_retriever.search(search_query)
+    return format_passages(passages)
@@ -0,0 +1,158 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from sqlalchemy import select, func
+from helpers.loog import logger
+from helpers.config import ToolConfig
+from databases import models
+from databases.crud import get_tools, TOOL_CHANGES_CHANNEL
+from databases.database import SessionLocal, engine
+
+@dataclass(frozen=True)
+class ToolConf(object):
+    """Detached, read-only copy of a `tools` row."""
+
+    id: int
+    name: str
+    status: str
+    host: Optional[str] = None
+    api_key: Optional[str] = None
+    cse_id: Optional[str] = None
+    client_id: Optional[str] = None
+    client_secret: Optional[str] = None
+    user_agent: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.status == "enable"
+
+    @classmethod
+    def from_model(cls, tool: models.ToolModel) -> "ToolConf":
+        return cls(
+            id=tool.id,
+            name=tool.name,
+            status=tool.status,
+            host=tool.host,
+            api_key=tool.api_key,
+            cse_id=tool.cse_id,
+            client_id=tool.client_id,
+            client_secret=tool.client_secret,
+            user_agent=tool.user_agent,
+        )
+
+class ToolRegistry(object):
+    """
+    Process-wide, in-memory view of the `tools` table.
+    Reloaded on Postgres NOTIFY events emitted by tool CRUD writes, with a
+    periodic fingerprint poll as fallback when the listener is unavailable.
+    """
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._tools: Dict[str, ToolConf] = {}
+        self._fingerprint = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._listen_conn = None
+        self._driver_conn = None
+        self._poll_task: Optional[asyncio.Task] = None
+
+    async def _read_fingerprint(self, session):
+        result = await session.execute(
+            select(
+                func.count(models.ToolModel.id),
+                func.max(func.coalesce(models.ToolModel.updated_at, models.ToolModel.created_at)),
+            )
+        )
+        return tuple(result.one())
+
+    async def reload(self):
+        """Reload every tool from the database and swap the in-memory view."""
+        async with self._lock:
+            async with SessionLocal() as session:
+                db_tools = await get_tools(session)
+                fingerprint = await self._read_fingerprint(session)
+            self._tools = {t.name: ToolConf.from_model(t) for t in db_tools}
+            self._fingerprint = fingerprint
+            self._loaded = True
+        logger.info(f"[ToolRegistry] Loaded {len(self._tools)} tool(s).")
+
+    async def _ensure_loaded(self):
+        if not self._loaded:
+            await self.reload()
+
+    async def get(self, tool_name: str) -> Optional[ToolConf]:
+        await self._ensure_loaded()
+        return self._tools.get(tool_name)
+
+    async def enabled(self) -> List[ToolConf]:
+        await self._ensure_loaded()
+        return [t for t in self._tools.values() if t.enabled]
+
+    def _on_notify(self, connection, pid, channel, payload):
+        logger.info(f"[ToolRegistry] Change notification received for '{payload}'.")
+        asyncio.get_running_loop().create_task(self._safe_reload())
+
+    async def _safe_reload(self):
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.error(f"[ToolRegistry] Reload failed: {e}")
+
+    async def _listen(self):
+        self._listen_conn = await engine.connect()
+        raw = await self._listen_conn.get_raw_connection()
+        self._driver_conn = raw.driver_connection
+        await self._driver_conn.add_listener(TOOL_CHANGES_CHANNEL, self._on_notify)
+        logger.info(f"[ToolRegistry] Listening on channel '{TOOL_CHANGES_CHANNEL}'.")
+
+    async def _close_listener(self):
+        if self._driver_conn is not None and not self._driver_conn.is_closed():
+            try:
+                await self._driver_conn.remove_listener(TOOL_CHANGES_CHANNEL, self._on_notify)
+            except Exception:
+                pass
+        if self._listen_conn is not None:
+            await self._listen_conn.close()
+        self._listen_conn = None
+        self._driver_conn = None
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if self._driver_conn is None or self._driver_conn.is_closed():
+                try:
+                    await self._close_listener()
+                    await self._listen()
+                except Exception as e:
+                    logger.error(f"[ToolRegistry] LISTEN reconnect failed: {e}")
+
+            try:
+                async with SessionLocal() as session:
+                    fingerprint = await self._read_fingerprint(session)
+                if fingerprint != self._fingerprint:
+                    await self.reload()
+            except Exception as e:
+                logger.error(f"[ToolRegistry] Poll failed: {e}")
+
+    async def start(self):
+        await self._safe_reload()
+        try:
+            await self._listen()
+        except Exception as e:
+            logger.error(f"[ToolRegistry] LISTEN unavailable, relying on polling: {e}")
+        if self._poll_task is None and self.poll_interval > 0:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        await self._close_listener()
+
+tool_conf = ToolConfig()
+tool_registry = ToolRegistry(poll_interval=float(tool_conf.tool_registry_poll_interval))
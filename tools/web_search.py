@@ -25,133 +25,184 @@ from langchain_community.tools import (
     SearxSearchRun,
 )
 
-from databases.crud import get_tool_by_name
-from databases.database import SessionLocal
+from tools.registry import tool_registry
+from tools.executor import tool_executor, ToolExecutionError
+from tools.cache import tool_result_cache
 
 async def get_tool_conf(tool_name: str):
-    """Fetch tool credentials from the database."""
-    async with SessionLocal() as session:
-        return await get_tool_by_name(session, tool_name)
+    """Fetch tool credentials from the in-memory tool registry."""
+    return await tool_registry.get(tool_name)
+
+async def run_tool(tool_name: str, search_query: str, func) -> str:
+    """Run a blocking tool call on the tool executor behind the result cache; failures are reported back to the model."""
+    try:
+        return await tool_result_cache.get_or_fetch(
+            tool_name,
+            search_query,
+            lambda: tool_executor.run(tool_name, func),
+        )
+    except ToolExecutionError as e:
+        return f"[{tool_name}] Tool error: {e}"
     
 @tool
 async def DuckDuckGo(search_query: str):
     """Perform web search using DuckDuckGo."""
     db_tool = await get_tool_conf("duckduckgo")
-    duckduckgo_wrapper = DuckDuckGoSearchAPIWrapper(max_results=5)
-    return DuckDuckGoSearchRun(
-        name="DuckDuckGoSearch",
-        api_wrapper=duckduckgo_wrapper,
-        description="Use this tool for general-purpose web searches when you need up-to-date or privacy-preserving results.",
-    ).run(search_query)
+
+    def search():
+        duckduckgo_wrapper = DuckDuckGoSearchAPIWrapper(max_results=5)
+        return DuckDuckGoSearchRun(
+            name="DuckDuckGoSearch",
+            api_wrapper=duckduckgo_wrapper,
+            description="Use this tool for general-purpose web searches when you need up-to-date or privacy-preserving results.",
+        ).run(search_query)
+
+    return await run_tool("duckduckgo", search_query, search)
 
 @tool
 async def Arxiv(search_query: str):
     """Perform academic paper search via Arxiv."""
     db_tool = await get_tool_conf("arxiv")
-    arxiv_wrapper = ArxivAPIWrapper(top_k_results=3, doc_content_chars_max=500)
-    return ArxivQueryRun(
-        name="ArxivSearch",
-        api_wrapper=arxiv_wrapper,
-        description="Use this tool to search and summarize academic or scientific papers from Arxiv. Ideal for technical or research topics.",
-    ).run(search_query)
+
+    def search():
+        arxiv_wrapper = ArxivAPIWrapper(top_k_results=3, doc_content_chars_max=500)
+        return ArxivQueryRun(
+            name="ArxivSearch",
+            api_wrapper=arxiv_wrapper,
+            description="Use this tool to search and summarize academic or scientific papers from Arxiv. Ideal for technical or research topics.",
+        ).run(search_query)
+
+    return await run_tool("arxiv", search_query, search)
 
 @tool
 async def Wikipedia(search_query: str):
     """Perform encyclopedia search via Wikipedia."""
     db_tool = await get_tool_conf("wikipedia")
-    wiki_wrapper = WikipediaAPIWrapper(top_k_results=3, doc_content_chars_max=500)
-    return WikipediaQueryRun(
-        name="WikipediaSearch",
-        api_wrapper=wiki_wrapper,
-        description="Use this tool for general factual or historical information from Wikipedia.",
-    ).run(search_query)
+
+    def search():
+        wiki_wrapper = WikipediaAPIWrapper(top_k_results=3, doc_content_chars_max=500)
+        return WikipediaQueryRun(
+            name="WikipediaSearch",
+            api_wrapper=wiki_wrapper,
+            description="Use this tool for general factual or historical information from Wikipedia.",
+        ).run(search_query)
+
+    return await run_tool("wikipedia", search_query, search)
 
 @tool
 async def GoogleSearch(search_query: str):
     """Perform web search using Google."""
     db_tool = await get_tool_conf("google_search")
-    google_wrapper = GoogleSearchAPIWrapper(
-        google_api_key=db_tool.api_key,
-        google_cse_id=db_tool.cse_id,
-    )
-    return GoogleSearchRun(
-        name="GoogleSearch",
-        api_wrapper=google_wrapper,
-        description="Use this tool for broad and up-to-date web searches using Google.",
-    ).run(search_query)
+
+    def search():
+        google_wrapper = GoogleSearchAPIWrapper(
+            google_api_key=db_tool.api_key,
+            google_cse_id=db_tool.cse_id,
+        )
+        return GoogleSearchRun(
+            name="GoogleSearch",
+            api_wrapper=google_wrapper,
+            description="Use this tool for broad and up-to-date web searches using Google.",
+        ).run(search_query)
+
+    return await run_tool("google_search", search_query, search)
 
 @tool
 async def GoogleScholar(search_query: str):
     """Perform academic search via Google Scholar."""
     db_tool = await get_tool_conf("google_scholar")
-    scholar_wrapper = GoogleScholarAPIWrapper(
-        top_k_results=5,
-        serp_api_key=db_tool.api_key,
-    )
-    return GoogleScholarQueryRun(
-        name="GoogleScholarSearch",
-        api_wrapper=scholar_wrapper,
-        description="Use this tool to find peer-reviewed research papers from Google Scholar.",
-    ).run(search_query)
+
+    def search():
+        scholar_wrapper = GoogleScholarAPIWrapper(
+            top_k_results=5,
+            serp_api_key=db_tool.api_key,
+        )
+        return GoogleScholarQueryRun(
+            name="GoogleScholarSearch",
+            api_wrapper=scholar_wrapper,
+            description="Use this tool to find peer-reviewed research papers from Google Scholar.",
+        ).run(search_query)
+
+    return await run_tool("google_scholar", search_query, search)
 
 @tool
 async def GoogleTrends(search_query: str):
     """Analyze keyword popularity via Google Trends."""
     db_tool = await get_tool_conf("google_trends")
-    trends_wrapper = GoogleTrendsAPIWrapper(serp_api_key=db_tool.api_key)
-    return GoogleTrendsQueryRun(
-        name="GoogleTrends",
-        api_wrapper=trends_wrapper,
-        description="Use this tool to analyze trending search topics over time or regions.",
-    ).run(search_query)
+
+    def search():
+        trends_wrapper = GoogleTrendsAPIWrapper(serp_api_key=db_tool.api_key)
+        return GoogleTrendsQueryRun(
+            name="GoogleTrends",
+            api_wrapper=trends_wrapper,
+            description="Use this tool to analyze trending search topics over time or regions.",
+        ).run(search_query)
+
+    return await run_tool("google_trends", search_query, search)
 
 @tool
 async def AskNews(search_query: str):
     """Search current news headlines and articles."""
     db_tool = await get_tool_conf("asknews")
-    ask_wrapper = AskNewsAPIWrapper(
-        asknews_client_id=db_tool.client_id,
-        asknews_client_secret=db_tool.client_secret,
-    )
-    return AskNewsSearch(
-        name="AskNews",
-        api_wrapper=ask_wrapper,
-        description="Use this tool to search for breaking news and recent media coverage.",
-    ).run(search_query)
+
+    def search():
+        ask_wrapper = AskNewsAPIWrapper(
+            asknews_client_id=db_tool.client_id,
+            asknews_client_secret=db_tool.client_secret,
+        )
+        return AskNewsSearch(
+            name="AskNews",
+            api_wrapper=ask_wrapper,
+            description="Use this tool to search for breaking news and recent media coverage.",
+        ).run(search_query)
+
+    return await run_tool("asknews", search_query, search)
 
 @tool
 async def RedditSearch(search_query: str):
     """Search Reddit posts and comments."""
     db_tool = await get_tool_conf("reddit")
-    reddit_wrapper = RedditSearchAPIWrapper(
-        reddit_client_id=db_tool.client_id,
-        reddit_client_secret=db_tool.client_secret,
-        reddit_user_agent=db_tool.user_agent,
-    )
-    return RedditSearchRun(
-        name="RedditSearch",
-        api_wrapper=reddit_wrapper,
-        description="Use this tool to search Reddit posts and community discussions.",
-    ).run(search_query)
+
+    def search():
+        reddit_wrapper = RedditSearchAPIWrapper(
+            reddit_client_id=db_tool.client_id,
+            reddit_client_secret=db_tool.client_secret,
+            reddit_user_agent=db_tool.user_agent,
+        )
+        return RedditSearchRun(
+            name="RedditSearch",
+            api_wrapper=reddit_wrapper,
+            description="Use this tool to search Reddit posts and community discussions.",
+        ).run(search_query)
+
+    return await run_tool("reddit", search_query, search)
 
 @tool
 async def SearxSearch(search_query: str):
     """Perform privacy-friendly web search using Searx."""
     db_tool = await get_tool_conf("searx")
-    searx_wrapper = SearxSearchWrapper(searx_host=db_tool.host)
-    return SearxSearchRun(
-        name="SearxSearch",
-        wrapper=searx_wrapper,
-        description="Use this tool for privacy-respecting meta search results across multiple engines.",
-    ).run(search_query)
+
+    def search():
+        searx_wrapper = SearxSearchWrapper(searx_host=db_tool.host)
+        return SearxSearchRun(
+            name="SearxSearch",
+            wrapper=searx_wrapper,
+            description="Use this tool for privacy-respecting meta search results across multiple engines.",
+        ).run(search_query)
+
+    return await run_tool("searx", search_query, search)
 
 @tool
 async def OpenWeather(search_query: str):
     """Query weather data via OpenWeatherMap."""
     db_tool = await get_tool_conf("openweather")
-    openweather_wrapper = OpenWeatherMapAPIWrapper(openweathermap_api_key=db_tool.api_key)
-    return OpenWeatherMapQueryRun(
-        name="WeatherQuery",
-        api_wrapper=openweather_wrapper,
-        description="Use this tool to get current or forecasted weather information for a given location.",
-    ).run(search_query)
+
+    def search():
+        openweather_wrapper = OpenWeatherMapAPIWrapper(openweathermap_api_key=db_tool.api_key)
+        return OpenWeatherMapQueryRun(
+            name="WeatherQuery",
+            api_wrapper=openweather_wrapper,
+            description="Use this tool to get current or forecasted weather information for a given location.",
+        ).run(search_query)
+
+    return await run_tool("openweather", search_query, search)